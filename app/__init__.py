@@ -1,5 +1,7 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.engine import make_url
 import os
 from dotenv import load_dotenv
 
@@ -26,12 +28,73 @@ def create_app():
     db_file = os.path.join(db_dir, 'attendance.db')
     db_uri = os.environ.get('DATABASE_URL', f'sqlite:///{db_file}')
     
-    print(f"Using database at: {db_file}")
+    app.logger.info("Using database at: %s", make_url(db_uri).render_as_string(hide_password=True))
     app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Keep compiled templates on disk so new workers skip Jinja compilation
+    jinja_cache_dir = os.environ.get('JINJA_CACHE_DIR', os.path.join(db_dir, 'jinja_cache'))
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(jinja_cache_dir)}
+    
+    # How many minutes before a class starts the kiosk opens it as the current class
+    app.config['KIOSK_OPENS_EARLY_MINUTES'] = int(os.environ.get('KIOSK_OPENS_EARLY_MINUTES', 15))
+    
+    # Dashboard analytics are recomputed when check-ins change, but at most
+    # once per this many seconds per worker
+    app.config['ANALYTICS_MIN_INTERVAL'] = int(os.environ.get('ANALYTICS_MIN_INTERVAL', 60))
+    
+    # Days of check-ins kept in the attendance table by `flask archive-attendance`
+    app.config['ATTENDANCE_HOT_DAYS'] = int(os.environ.get('ATTENDANCE_HOT_DAYS', 180))
+    
+    # Write-behind check-ins: acknowledge taps once journaled and commit them
+    # in one transaction every CHECKIN_FLUSH_INTERVAL seconds. The journal is
+    # flushed to the OS on every tap; CHECKIN_JOURNAL_FSYNC=1 also fsyncs it.
+    app.config['CHECKIN_WRITE_BEHIND'] = os.environ.get('CHECKIN_WRITE_BEHIND', '0') == '1'
+    app.config['CHECKIN_FLUSH_INTERVAL'] = float(os.environ.get('CHECKIN_FLUSH_INTERVAL', 0.005))
+    app.config['CHECKIN_JOURNAL_DIR'] = os.environ.get('CHECKIN_JOURNAL_DIR', os.path.join(db_dir, 'checkin_journal'))
+    app.config['CHECKIN_JOURNAL_FSYNC'] = os.environ.get('CHECKIN_JOURNAL_FSYNC', '0') == '1'
+    
+    # Kiosk live updates: how often each event stream checks for changes, and
+    # how long a stream stays open before the browser reconnects
+    app.config['KIOSK_EVENTS_POLL_INTERVAL'] = float(os.environ.get('KIOSK_EVENTS_POLL_INTERVAL', 0.5))
+    app.config['KIOSK_EVENTS_TIMEOUT'] = int(os.environ.get('KIOSK_EVENTS_TIMEOUT', 30))
+    
+    # Chat assistant: backend ('openai', 'stub' or 'module:function'), hard
+    # timeout, per-process concurrency cap and answer cache
+    app.config['CHAT_BACKEND'] = os.environ.get('CHAT_BACKEND', 'openai')
+    app.config['CHAT_TIMEOUT'] = float(os.environ.get('CHAT_TIMEOUT', 10))
+    app.config['CHAT_MAX_CONCURRENCY'] = int(os.environ.get('CHAT_MAX_CONCURRENCY', 4))
+    app.config['CHAT_CACHE_SIZE'] = int(os.environ.get('CHAT_CACHE_SIZE', 256))
+    app.config['CHAT_CACHE_TTL'] = int(os.environ.get('CHAT_CACHE_TTL', 3600))
+    app.config['CHAT_STUB_DELAY'] = float(os.environ.get('CHAT_STUB_DELAY', 0))
+    
+    # Request instrumentation: Server-Timing header on every response, and
+    # SQL statements slower than this many seconds are logged (0 disables)
+    app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '1') == '1'
+    app.config['SLOW_QUERY_THRESHOLD'] = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.25))
+    
+    # Engine profile: connection pool and per-connection settings for the database
+    app.config['DATABASE_PROFILE'] = os.environ.get('DATABASE_PROFILE')
+    from app.database import init_engine_options, apply_on_connect
+    init_engine_options(app)
+    
+    # Serving from gevent greenlets (see gunicorn.conf.py)
+    from app.serving import cooperative, prepare_cooperative
+    if cooperative():
+        app.logger.info("Cooperative (gevent) serving mode")
+        prepare_cooperative(app)
+    # Each kiosk event stream holds a connection open, which only gevent
+    # workers can afford; otherwise kiosks poll the roster unless KIOSK_EVENTS=1
+    app.config['KIOSK_EVENTS'] = os.environ.get('KIOSK_EVENTS', '1' if cooperative() else '0') == '1'
+    app.config['KIOSK_POLL_INTERVAL'] = float(os.environ.get('KIOSK_POLL_INTERVAL', 5))
+    
     # Initialize extensions with app
     db.init_app(app)
+    from app.metrics import init_metrics
+    with app.app_context():
+        apply_on_connect(db.engine, app.config['DATABASE_PROFILE'])
+        init_metrics(app, db.engine)
     
     # Register blueprints
     from app.routes import main, admin, auth
@@ -46,8 +109,16 @@ def create_app():
     from app import cli
     cli.init_app(app)
     
-    # Create database tables
+    # Create database tables and apply index upgrades, unless another worker
+    # already brought this database up to date
+    from app.schema import ensure_schema
     with app.app_context():
-        db.create_all()
+        ensure_schema(lock_path=os.path.join(db_dir, 'schema.lock'))
+        
+        # Commit check-ins journaled by workers that died before flushing
+        from app.writebehind import recover_journals
+        replayed = recover_journals(app)
+        if replayed:
+            app.logger.warning("Replayed %d check-ins from write-behind journals", replayed)
     
     return app
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+from itertools import chain
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.archive import all_checkins
+from app.sql import epoch_days
+from app.versions import ATTENDANCE_KEY, current_version
+
+# How many monthly cohorts, months after joining, and months of churn the
+# dashboard shows
+COHORTS = 12
+COHORT_MONTHS = 12
+CHURN_MONTHS = 12
+# Occupancy covers this many recent weeks so old timetables don't skew it
+OCCUPANCY_WEEKS = 26
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+Analytics = namedtuple('Analytics', [
+    'checkins',     # check-ins analysed, archive included
+    'students',     # distinct students among them
+    'retention',    # [(cohort month, size, [share still coming k months later or None])]
+    'churn',        # [(month, active, new, lapsed, churn rate or None)]
+    'occupancy',    # {class_id: [average headcount per weekday, Monday first, or None]}
+    'peak',         # highest average headcount in occupancy (for shading)
+    'seconds'       # time taken to compute
+])
+
+def load_columns():
+    """Return (student_id, class_id, day) int32 arrays for every check-in, archive included.
+
+    One query; dates come back as days since 1970-01-01 so no Python date
+    objects are built, and the rows are read straight off the DBAPI cursor
+    since building a Row per check-in would cost more than the query.
+    """
+    checkins = all_checkins('student_id', 'class_id', 'date')
+    result = db.session.connection().execute(select(
+        checkins.c.student_id, checkins.c.class_id, epoch_days(checkins.c.date)
+    ))
+    try:
+        columns = np.fromiter(chain.from_iterable(result.cursor), dtype=np.int32).reshape(-1, 3)
+    finally:
+        result.close()
+    return columns[:, 0], columns[:, 1], columns[:, 2]
+
+def _month_label(month):
+    """'Mar 2024' for a month counted from January 1970"""
+    return date(1970 + month // 12, month % 12 + 1, 1).strftime('%b %Y')
+
+def compute(student_ids, class_ids, days, today):
+    """Build the dashboard analytics from check-in columns, without Python loops over rows.
+
+    Students are mapped to dense indexes and their activity to a students x
+    months boolean matrix; retention, churn and occupancy are then sums and
+    bincounts over that matrix and the raw columns.
+    """
+    start = time.perf_counter()
+    today_day = (today - date(1970, 1, 1)).days
+    last_month = (today.year - 1970) * 12 + today.month - 1
+    if not len(days):
+        return Analytics(0, 0, [], [], {}, 0, time.perf_counter() - start)
+
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    first_month = int(months.min())
+    last_month = max(last_month, int(months.max()))
+    n_months = last_month - first_month + 1
+    students, student_index = np.unique(student_ids, return_inverse=True)
+
+    active = np.zeros((len(students), n_months), dtype=bool)
+    active[student_index, months - first_month] = True
+    joined = active.argmax(axis=1)
+
+    # Retention: cohort (month of first check-in) x months since joining
+    cells, offsets = np.nonzero(active)
+    offsets = offsets - joined[cells]
+    cohort_counts = np.bincount(
+        joined[cells] * n_months + offsets, minlength=n_months * n_months
+    ).reshape(n_months, n_months)
+    sizes = cohort_counts[:, 0]
+    retention = []
+    for cohort in np.flatnonzero(sizes)[-COHORTS:]:
+        observed = n_months - cohort
+        retention.append((
+            _month_label(first_month + int(cohort)),
+            int(sizes[cohort]),
+            [float(cohort_counts[cohort, k] / sizes[cohort]) if k < observed else None
+             for k in range(COHORT_MONTHS)]
+        ))
+
+    # Churn: students seen one month and not the next
+    counts = active.sum(axis=0)
+    new = np.bincount(joined, minlength=n_months)
+    lapsed = np.concatenate(([0], (active[:, :-1] & ~active[:, 1:]).sum(axis=0)))
+    churn = []
+    for month in range(max(0, n_months - CHURN_MONTHS), n_months):
+        previous = counts[month - 1] if month else 0
+        churn.append((
+            _month_label(first_month + month),
+            int(counts[month]),
+            int(new[month]),
+            int(lapsed[month]),
+            float(lapsed[month] / previous) if previous else None
+        ))
+
+    # Occupancy: average headcount of a class's sessions on each weekday
+    span = OCCUPANCY_WEEKS * 7
+    recent = (days > today_day - span) & (days <= today_day)
+    classes, class_index = np.unique(class_ids[recent], return_inverse=True)
+    sessions, headcounts = np.unique(
+        class_index.astype(np.int64) * span + (today_day - days[recent]), return_counts=True
+    )
+    session_class = sessions // span
+    # 1970-01-01 was a Thursday
+    session_weekday = (today_day - sessions % span + 3) % 7
+    cell = session_class * 7 + session_weekday
+    totals = np.bincount(cell, weights=headcounts, minlength=len(classes) * 7).reshape(-1, 7)
+    held = np.bincount(cell, minlength=len(classes) * 7).reshape(-1, 7)
+    averages = np.divide(totals, held, out=np.zeros_like(totals), where=held > 0)
+    occupancy = {
+        int(class_id): [float(averages[i, d]) if held[i, d] else None for d in range(7)]
+        for i, class_id in enumerate(classes)
+    }
+
+    return Analytics(
+        checkins=len(days),
+        students=len(students),
+        retention=retention,
+        churn=churn,
+        occupancy=occupancy,
+        peak=float(averages.max()) if averages.size else 0,
+        seconds=time.perf_counter() - start
+    )
+
+class AnalyticsCache:
+    """Per-worker cache of the dashboard analytics, keyed by the attendance version.
+
+    Every check-in write bumps the 'attendance' version, so a cached result
+    is served as long as the version is unchanged. While a class is checking
+    in the version moves constantly; a result younger than
+    ANALYTICS_MIN_INTERVAL seconds is then still served rather than
+    recomputing on every page view. Only one request per worker recomputes
+    at a time; the others wait for its result. version() tells pages which
+    attendance version the analytics they would get were computed at.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None      # (version, day, computed_at monotonic, Analytics)
+
+    def _usable(self, version, today):
+        """The cache entry to serve for version, or None to recompute"""
+        entry = self._entry
+        if entry is None or entry[1] != today:
+            return None
+        if entry[0] == version:
+            return entry
+        if time.monotonic() - entry[2] < current_app.config.get('ANALYTICS_MIN_INTERVAL', 60):
+            return entry
+        return None
+
+    def version(self, today=None):
+        """The attendance version get() would currently answer from, without computing"""
+        version = current_version(ATTENDANCE_KEY)
+        entry = self._usable(version, today or date.today())
+        return version if entry is None else entry[0]
+
+    def get(self, today=None):
+        """Return the Analytics for the current attendance data."""
+        today = today or date.today()
+        version = current_version(ATTENDANCE_KEY)
+        entry = self._usable(version, today)
+        if entry is not None:
+            return entry[3]
+        with self._lock:
+            entry = self._usable(version, today)
+            if entry is None:
+                start = time.perf_counter()
+                analytics = compute(*load_columns(), today)
+                analytics = analytics._replace(seconds=time.perf_counter() - start)
+                entry = self._entry = (version, today, time.monotonic(), analytics)
+            return entry[3]
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,133 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+SYSTEM_PROMPT = "You are a helpful assistant for a student check-in system. Keep responses concise and helpful."
+
+class ChatUnavailable(Exception):
+    """The chat backend cannot answer right now (busy or timed out)"""
+
+def openai_backend(message, timeout, api_key):
+    """Ask OpenAI (v0.28 API). Imported lazily so workers don't load it at startup."""
+    import openai
+
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": message}
+        ],
+        api_key=api_key,
+        request_timeout=timeout
+    )
+    return response.choices[0].message['content'].strip()
+
+def stub_backend(message, timeout, api_key, delay=0.0):
+    """Offline stand-in for tests and benchmarks; sleeps delay seconds"""
+    if delay:
+        time.sleep(delay)
+    return f"(stub) You asked: {message}"
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+class ChatService:
+    """Runs chat requests off the request thread with hard limits.
+
+    Upstream calls run on a bounded thread pool. At most max_concurrency may
+    be in flight per process; further requests are refused immediately
+    rather than queueing behind them. A request waits at most timeout
+    seconds for its answer, and answers are cached by normalized question.
+
+    The request itself still waits for the answer. Under gevent workers
+    (the gunicorn.conf.py default) that wait only parks a greenlet; under
+    sync workers each chat call holds its worker for up to timeout seconds,
+    and the cap and timeout are what bound the damage.
+    """
+
+    def __init__(self, backend, max_concurrency=4, timeout=10.0, cache_size=256, cache_ttl=3600):
+        self.backend = backend
+        self.timeout = timeout
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='chat')
+
+    @staticmethod
+    def cache_key(message):
+        return ' '.join(message.lower().split())
+
+    def reply(self, message, api_key=None):
+        """Return the answer to message, raising ChatUnavailable if busy or too slow."""
+        key = self.cache_key(message)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if not self._slots.acquire(blocking=False):
+            raise ChatUnavailable('The assistant is busy right now. Please try again in a moment.')
+        try:
+            future = self._executor.submit(self.backend, message, self.timeout, api_key)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the upstream call really finishes, even if we
+        # stop waiting for it, so slow calls can't pile up past the cap
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            answer = future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise ChatUnavailable('The assistant took too long to answer. Please try again.')
+        self.cache.set(key, answer)
+        return answer
+
+def load_backend(name, stub_delay=0.0):
+    """Resolve CHAT_BACKEND: 'openai', 'stub', or a 'module:function' path"""
+    if name == 'openai':
+        return openai_backend
+    if name == 'stub':
+        return lambda message, timeout, api_key: stub_backend(message, timeout, api_key, delay=stub_delay)
+    module_name, _, attribute = name.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+def get_chat_service(app):
+    """Return the app's ChatService, creating it on first use"""
+    service = app.extensions.get('chat_service')
+    if service is None:
+        service = ChatService(
+            load_backend(app.config['CHAT_BACKEND'], app.config['CHAT_STUB_DELAY']),
+            max_concurrency=app.config['CHAT_MAX_CONCURRENCY'],
+            timeout=app.config['CHAT_TIMEOUT'],
+            cache_size=app.config['CHAT_CACHE_SIZE'],
+            cache_ttl=app.config['CHAT_CACHE_TTL']
+        )
+        service = app.extensions.setdefault('chat_service', service)
+    return service
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Attendance, ArchivedAttendance
+
+ARCHIVE_COLUMNS = ['student_id', 'class_id', 'date', 'time_in']
+
+def archived_through():
+    """Latest date held in the archive, or None if it is empty"""
+    return db.session.query(func.max(ArchivedAttendance.date)).scalar()
+
+def reaches_archive(start_date):
+    """True if a range starting at start_date (None = open) needs archived rows"""
+    latest = archived_through()
+    return latest is not None and (start_date is None or start_date <= latest)
+
+def all_checkins(*columns):
+    """Subquery over the given columns of attendance and its archive together"""
+    return union_all(
+        select(*(getattr(Attendance, column) for column in columns)),
+        select(*(getattr(ArchivedAttendance, column) for column in columns))
+    ).subquery()
+
+def day_records(class_id, day):
+    """Check-ins for one class and date, with students loaded, from wherever they live"""
+    models = [Attendance, ArchivedAttendance] if reaches_archive(day) else [Attendance]
+    records = []
+    for model in models:
+        records.extend(model.query.options(joinedload(model.student)).filter(
+            model.class_id == class_id,
+            model.date == day
+        ).all())
+    return sorted(records, key=lambda record: record.time_in)
+
+def archive_attendance(before, progress=None):
+    """Move check-ins dated before `before` into the archive; return the count.
+
+    Works a month at a time, each month copied and deleted in one
+    transaction, so an interrupted run leaves no row in both tables and can
+    simply be repeated. progress(month_start, moved) is called per month.
+    Daily headcount rollups are untouched; they already cover every day.
+    """
+    def oldest():
+        return db.session.query(func.min(Attendance.date)).filter(Attendance.date < before).scalar()
+
+    moved = 0
+    month = oldest()
+    while month is not None:
+        month_start = month.replace(day=1)
+        month_end = min((month_start + timedelta(days=32)).replace(day=1), before)
+        in_month = (Attendance.date >= month_start) & (Attendance.date < month_end)
+
+        db.session.execute(ArchivedAttendance.__table__.insert().from_select(
+            ARCHIVE_COLUMNS,
+            select(*(getattr(Attendance, column) for column in ARCHIVE_COLUMNS)).where(in_month)
+        ))
+        count = db.session.execute(Attendance.__table__.delete().where(in_month)).rowcount
+        db.session.commit()
+
+        moved += count
+        if progress:
+            progress(month_start, count)
+        month = oldest()
+    return moved
@@ -0,0 +1,80 @@
+import threading
+from sqlalchemy import event
+from app import db
+from app.models import Attendance
+from app.versions import attendance_key, current_version
+
+class CheckedInCache:
+    """Per-worker cache of the checked-in student ids for each (class, day).
+
+    Every check-in write bumps the DataVersion row for its (class, day) in the
+    same transaction. A read compares that version with the cached one, so a
+    hit costs one primary-key lookup and never touches the attendance table,
+    and changes committed by other gunicorn workers are picked up on the next
+    read. Writes made by this worker are applied to the cached set after
+    commit (write-through) rather than forcing a reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}      # (class_id, day) -> (version, frozenset of ids)
+
+    def get(self, class_id, day):
+        """Return the frozenset of student ids checked in to class_id on day."""
+        class_id = int(class_id)
+        version = current_version(attendance_key(class_id, day))
+        entry = self._entries.get((class_id, day))
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        
+        ids = frozenset(row[0] for row in db.session.query(Attendance.student_id).filter(
+            Attendance.class_id == class_id,
+            Attendance.date == day
+        ))
+        self._store(class_id, day, version, ids)
+        return ids
+
+    def _store(self, class_id, day, version, ids):
+        with self._lock:
+            # Only today's classes are hot; drop entries for other days
+            for key in [key for key in self._entries if key[1] != day]:
+                del self._entries[key]
+            current = self._entries.get((class_id, day))
+            if current is None or current[0] <= version:
+                self._entries[(class_id, day)] = (version, ids)
+
+    def apply(self, class_id, day, version, added=(), removed=()):
+        """Apply a committed change that moved (class, day) to version.
+
+        The cached set is patched only if it was exactly one version behind;
+        otherwise it is dropped and reloaded on the next read.
+        """
+        with self._lock:
+            entry = self._entries.get((class_id, day))
+            if entry is None:
+                return
+            if entry[0] == version - 1:
+                self._entries[(class_id, day)] = (version, (entry[1] | set(added)) - set(removed))
+            elif entry[0] < version:
+                del self._entries[(class_id, day)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+checked_in_cache = CheckedInCache()
+
+def note_change(class_id, day, version, added=(), removed=()):
+    """Queue a cache update to be applied once the current transaction commits."""
+    db.session.info.setdefault('checked_in_changes', []).append(
+        (int(class_id), day, version, tuple(added), tuple(removed))
+    )
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_changes(session):
+    for change in session.info.pop('checked_in_changes', ()):
+        checked_in_cache.apply(*change)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_changes(session, previous_transaction):
+    session.info.pop('checked_in_changes', None)
@@ -0,0 +1,216 @@
+from collections import defaultdict
+from datetime import timedelta
+from app import db
+from app.cache import checked_in_cache, note_change
+from app.models import Student, DanceClass, Attendance, CheckinReceipt
+from app.rollup import adjust_headcount
+from app.sql import dialect_insert
+from app.stats import note_checkins, refresh_stats
+from app.versions import ATTENDANCE_KEY, attendance_key, bump_version
+
+def _changed(class_id, day, added=(), removed=(), time_in=None):
+    """Keep derived data in step with a check-in write, in the same transaction.
+
+    time_in is the check-in time of the added students: one datetime for
+    all of them, or a {student_id: datetime} mapping.
+    """
+    version = bump_version(attendance_key(class_id, day))
+    bump_version(ATTENDANCE_KEY)
+    note_change(class_id, day, version, added=added, removed=removed)
+    adjust_headcount(class_id, day, len(added) - len(removed))
+    if added:
+        times = time_in if isinstance(time_in, dict) else dict.fromkeys(added, time_in)
+        note_checkins(day, times)
+    if removed:
+        refresh_stats(removed)
+
+def record_checkin(student_id, class_id, day, time_in):
+    """Insert a check-in, or return the existing one, in a single statement.
+
+    Relies on the unique (student_id, class_id, date) index: on conflict the
+    row is left untouched and its original time_in is returned. Returns a
+    (time_in, created) tuple. The caller is responsible for committing; the
+    checked-in cache is updated once the commit succeeds.
+    """
+    table = Attendance.__table__
+    stmt = dialect_insert(table).values(
+        student_id=student_id,
+        class_id=class_id,
+        date=day,
+        time_in=time_in
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['student_id', 'class_id', 'date'],
+        set_={'time_in': table.c.time_in}
+    ).returning(table.c.time_in)
+
+    existing_time = db.session.execute(stmt).scalar_one()
+    created = existing_time == time_in
+    if created:
+        _changed(class_id, day, added=[student_id], time_in=time_in)
+    return existing_time, created
+
+def record_checkins(student_ids, class_id, day, time_in):
+    """Check in many students with a fixed number of queries.
+
+    One query resolves which ids are real students, the checked-in cache
+    finds those already checked in, and the remainder is written with one
+    bulk insert. Returns the list of Student rows that were newly checked in,
+    in the order their ids were given. The caller is responsible for
+    committing.
+    """
+    ids = {}
+    for student_id in student_ids:
+        try:
+            ids[int(student_id)] = None
+        except (TypeError, ValueError):
+            continue
+    if not ids:
+        return []
+    
+    students = {
+        student.id: student
+        for student in Student.query.filter(Student.id.in_(ids))
+    }
+    already = checked_in_cache.get(class_id, day) if students else frozenset()
+    
+    new_students = [students[i] for i in ids if i in students and i not in already]
+    if new_students:
+        # DO NOTHING covers a concurrent check-in landing between the queries;
+        # RETURNING tells us which rows were actually inserted
+        table = Attendance.__table__
+        stmt = dialect_insert(table).on_conflict_do_nothing(
+            index_elements=['student_id', 'class_id', 'date']
+        ).returning(table.c.student_id)
+        inserted = set(db.session.execute(stmt, [
+            {
+                'student_id': student.id,
+                'class_id': class_id,
+                'date': day,
+                'time_in': time_in
+            }
+            for student in new_students
+        ]).scalars())
+        new_students = [student for student in new_students if student.id in inserted]
+        if new_students:
+            _changed(class_id, day, added=[student.id for student in new_students], time_in=time_in)
+    
+    return new_students
+
+def _uncheck_receipt(student_id, class_id, day):
+    """Receipt id recording the latest un-check of a student for a class and day"""
+    return f'uncheck:{student_id}:{class_id}:{day.isoformat()}'
+
+def remove_checkin(student_id, class_id, day, now):
+    """Delete a check-in if there is one. Returns True if a row was removed.
+
+    Also records when the un-check happened, so a tap made before it but
+    committed later (queued offline, or by another worker's write-behind
+    queue) is cancelled by replay_checkins instead of checking the student
+    back in. The caller is responsible for committing.
+    """
+    table = CheckinReceipt.__table__
+    db.session.execute(dialect_insert(table).values(
+        client_id=_uncheck_receipt(student_id, class_id, day), received_at=now
+    ).on_conflict_do_update(index_elements=['client_id'], set_={'received_at': now}))
+    
+    removed = Attendance.query.filter_by(
+        student_id=student_id,
+        class_id=class_id,
+        date=day
+    ).delete(synchronize_session=False)
+    if removed:
+        _changed(class_id, day, removed=[student_id])
+    return bool(removed)
+
+# How long replay receipts are kept for de-duplication
+RECEIPT_RETENTION = timedelta(days=7)
+
+def replay_checkins(taps, now):
+    """Apply check-ins queued by a kiosk, de-duplicating on client ids.
+
+    taps is a list of (client_id, student_id, class_id, tapped_at) tuples.
+    Each check-in keeps its original tap time (capped at now) and is filed
+    under that day. Returns {client_id: status} where status is one of
+    'checked_in', 'already', 'duplicate' (replayed before), 'invalid',
+    'cancelled' (the student was un-checked after the tap) or 'rejected'
+    (tapped longer than RECEIPT_RETENTION ago, so a replay could no longer
+    be told apart from a new tap). The caller is responsible for
+    committing.
+    """
+    if not taps:
+        return {}
+    
+    statuses = {}
+    oldest = now - RECEIPT_RETENTION
+    for tap in taps:
+        if tap[3] < oldest:
+            statuses[tap[0]] = 'rejected'
+    taps = [tap for tap in taps if tap[0] not in statuses]
+    if not taps:
+        return statuses
+    
+    # Claim the client ids; ids claimed by an earlier replay come back missing
+    table = CheckinReceipt.__table__
+    stmt = dialect_insert(table).on_conflict_do_nothing(
+        index_elements=['client_id']
+    ).returning(table.c.client_id)
+    fresh = set(db.session.execute(stmt, [
+        {'client_id': client_id, 'received_at': now}
+        for client_id in {tap[0] for tap in taps}
+    ]).scalars())
+    
+    statuses.update((tap[0], 'duplicate') for tap in taps)
+    taps = [tap for tap in taps if tap[0] in fresh]
+    
+    student_ids = {row[0] for row in db.session.query(Student.id).filter(
+        Student.id.in_({tap[1] for tap in taps})
+    )}
+    class_ids = {row[0] for row in db.session.query(DanceClass.id).filter(
+        DanceClass.id.in_({tap[2] for tap in taps})
+    )}
+    unchecked = dict(db.session.query(CheckinReceipt.client_id, CheckinReceipt.received_at).filter(
+        CheckinReceipt.client_id.in_({
+            _uncheck_receipt(tap[1], tap[2], min(tap[3], now).date()) for tap in taps
+        })
+    ))
+    
+    # Group by class and day, keeping each student's earliest tap
+    groups = defaultdict(dict)
+    for client_id, student_id, class_id, tapped_at in sorted(taps, key=lambda tap: tap[3]):
+        if student_id not in student_ids or class_id not in class_ids:
+            statuses[client_id] = 'invalid'
+            continue
+        tapped_at = min(tapped_at, now)
+        unchecked_at = unchecked.get(_uncheck_receipt(student_id, class_id, tapped_at.date()))
+        if unchecked_at is not None and tapped_at <= unchecked_at:
+            statuses[client_id] = 'cancelled'
+            continue
+        groups[(class_id, tapped_at.date())].setdefault(student_id, (client_id, tapped_at))
+        statuses[client_id] = 'already'
+    
+    table = Attendance.__table__
+    for (class_id, day), first_taps in groups.items():
+        stmt = dialect_insert(table).on_conflict_do_nothing(
+            index_elements=['student_id', 'class_id', 'date']
+        ).returning(table.c.student_id)
+        inserted = set(db.session.execute(stmt, [
+            {
+                'student_id': student_id,
+                'class_id': class_id,
+                'date': day,
+                'time_in': tapped_at
+            }
+            for student_id, (client_id, tapped_at) in first_taps.items()
+        ]).scalars())
+        if inserted:
+            _changed(class_id, day, added=sorted(inserted),
+                     time_in={student_id: first_taps[student_id][1] for student_id in inserted})
+        for student_id in inserted:
+            statuses[first_taps[student_id][0]] = 'checked_in'
+    
+    CheckinReceipt.query.filter(
+        CheckinReceipt.received_at < now - RECEIPT_RETENTION
+    ).delete(synchronize_session=False)
+    
+    return statuses
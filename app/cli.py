@@ -1,8 +1,17 @@
 import click
+from datetime import date, timedelta
+from flask import current_app
 from flask.cli import with_appcontext
 from werkzeug.security import generate_password_hash
 from app import db
+from app.archive import archive_attendance
+from app.checkin import RECEIPT_RETENTION
 from app.models import User
+from app.importer import import_students, read_students
+from app.rollup import rebuild_rollups
+from app.schema import ensure_schema
+from app.search import student_index
+from app.stats import rebuild_stats
 
 @click.command('create-admin')
 @with_appcontext
@@ -39,6 +48,88 @@ def create_admin_command():
     
     click.echo(f"Admin user '{username}' created successfully!")
 
+@click.command('import-students')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--chunk-size', default=500, show_default=True, type=click.IntRange(min=1),
+              help='Students inserted per transaction.')
+@with_appcontext
+def import_students_command(csv_file, chunk_size):
+    """Import students from a CSV with first_name, last_name, email and phone columns."""
+    click.echo(f'Importing students from {csv_file.name}...')
+    
+    def progress(result):
+        click.echo(f"  {result.read} rows read, {result.imported} imported")
+    
+    try:
+        result = import_students(read_students(csv_file), chunk_size=chunk_size, progress=progress)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        # Other workers catch up from the student change log on their next search
+        student_index.invalidate()
+    
+    click.echo(f"Imported {result.imported} of {result.read} students.")
+    if result.skipped:
+        click.echo(f"Skipped {sum(result.skipped.values())}:")
+        for reason, count in result.skipped.most_common():
+            click.echo(f"  {reason}: {count}")
+        for line, reason in sorted(result.examples):
+            click.echo(f"  line {line}: {reason}")
+
+@click.command('archive-attendance')
+@click.option('--keep-days', type=click.IntRange(min=1), default=None,
+              help='Check-ins kept in the attendance table (default ATTENDANCE_HOT_DAYS).')
+@with_appcontext
+def archive_attendance_command(keep_days):
+    """Move old check-ins into the attendance archive."""
+    keep_days = keep_days or current_app.config['ATTENDANCE_HOT_DAYS']
+    # Kiosks may still replay taps this old; replays only de-duplicate
+    # against the attendance table, so those days must stay in it
+    if keep_days < RECEIPT_RETENTION.days:
+        raise click.ClickException(
+            f'Check-ins from the last {RECEIPT_RETENTION.days} days can still be replayed '
+            f'by kiosks; keep at least that many days (got {keep_days}).'
+        )
+    before = date.today() - timedelta(days=keep_days)
+    click.echo(f'Archiving check-ins before {before.isoformat()}...')
+    
+    def progress(month, moved):
+        click.echo(f"  {month.strftime('%Y-%m')}: {moved} check-ins")
+    
+    moved = archive_attendance(before, progress=progress)
+    click.echo(f"Archived {moved} check-ins.")
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Recompute the daily attendance headcounts from scratch."""
+    click.echo('Rebuilding daily attendance rollups...')
+    rows = rebuild_rollups()
+    click.echo(f"Rebuilt {rows} class-day headcounts.")
+
+@click.command('rebuild-student-stats')
+@with_appcontext
+def rebuild_student_stats_command():
+    """Recompute every student's check-in totals, last check-in and streak."""
+    click.echo('Rebuilding student attendance stats...')
+    rows = rebuild_stats()
+    click.echo(f"Rebuilt stats for {rows} students.")
+
+@click.command('upgrade-schema')
+@with_appcontext
+def upgrade_schema_command():
+    """Create missing tables and indexes, then record the schema revision."""
+    click.echo('Upgrading database schema...')
+    if ensure_schema():
+        click.echo('Schema upgraded.')
+    else:
+        click.echo('Schema is already up to date.')
+
 def init_app(app):
     """Register CLI commands with the app."""
     app.cli.add_command(create_admin_command)
+    app.cli.add_command(import_students_command)
+    app.cli.add_command(archive_attendance_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(rebuild_student_stats_command)
+    app.cli.add_command(upgrade_schema_command)
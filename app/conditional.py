@@ -0,0 +1,43 @@
+import hashlib
+from datetime import date
+from functools import wraps
+from flask import current_app, g, make_response, request, session
+from app.versions import current_versions
+
+def conditional_get(keys, stamp=None):
+    """Answer a GET with 304 Not Modified while its data versions stand still.
+
+    keys(*view_args) returns the version keys the page is built from. The
+    ETag hashes their versions with the URL and today's date, so checking
+    it costs one primary-key lookup and the view itself only runs when
+    something has changed. If part of the page comes from a cache that may
+    lag those versions, stamp() returns what identifies the cached copy
+    (such as the version it was computed at) and is hashed in too.
+    Responses carrying a flashed message are never treated as cacheable.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            versions = current_versions(keys(*args, **kwargs))
+            # Let the view reuse them (see request_version)
+            g.data_versions = versions
+            etag = hashlib.sha1(repr((
+                request.full_path, date.today().isoformat(), sorted(versions.items()),
+                stamp() if stamp else None
+            )).encode()).hexdigest()[:24]
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Cacheable, but the browser must check back every time
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,76 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Named engine profiles. 'engine_options' become SQLALCHEMY_ENGINE_OPTIONS and
+# 'on_connect' statements run on every new DBAPI connection.
+ENGINE_PROFILES = {
+    # Concurrent writers: readers never block the writer, writers queue on
+    # the busy timeout instead of failing with "database is locked", and
+    # fsync happens at checkpoints rather than on every commit.
+    'sqlite-wal': {
+        'engine_options': {'connect_args': {'timeout': 15}},
+        'on_connect': [
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA busy_timeout=15000',
+            'PRAGMA synchronous=NORMAL',
+        ],
+    },
+    # SQLite with the driver's defaults (rollback journal); kept for comparison
+    'sqlite-default': {
+        'engine_options': {},
+        'on_connect': [],
+    },
+    'postgresql': {
+        'engine_options': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+        },
+        'on_connect': [
+            "SET SESSION statement_timeout = '30s'",
+            "SET SESSION lock_timeout = '5s'",
+        ],
+    },
+}
+
+DEFAULT_PROFILES = {
+    'sqlite': 'sqlite-wal',
+    'postgresql': 'postgresql',
+}
+
+def profile_name(database_uri, requested=None):
+    """Pick the engine profile for a database URI (or validate the requested one)."""
+    if requested:
+        if requested not in ENGINE_PROFILES:
+            raise ValueError(f"Unknown DATABASE_PROFILE '{requested}'. "
+                             f"Choose from: {', '.join(ENGINE_PROFILES)}")
+        return requested
+    return DEFAULT_PROFILES.get(make_url(database_uri).get_backend_name())
+
+def init_engine_options(app):
+    """Set SQLALCHEMY_ENGINE_OPTIONS from the profile; call before db.init_app."""
+    name = profile_name(app.config['SQLALCHEMY_DATABASE_URI'], app.config.get('DATABASE_PROFILE'))
+    app.config['DATABASE_PROFILE'] = name
+    if name:
+        options = dict(ENGINE_PROFILES[name]['engine_options'])
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def apply_on_connect(engine, name):
+    """Run the profile's per-connection statements on every new connection."""
+    statements = ENGINE_PROFILES[name]['on_connect'] if name else []
+    if not statements:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+        # psycopg2 opens a transaction for the SET statements
+        if engine.dialect.name == 'postgresql':
+            dbapi_connection.commit()
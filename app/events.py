@@ -0,0 +1,42 @@
+import json
+import time
+from app import db
+from app.cache import checked_in_cache
+
+def _event(name, data):
+    """Format one Server-Sent Events message"""
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+def checkin_events(class_id, day, poll_interval=0.5, timeout=30, keepalive=15):
+    """Yield check-in and uncheck events for one class as Server-Sent Events.
+
+    The stream opens with a snapshot of the checked-in ids, then polls the
+    checked-in cache every poll_interval seconds and emits the difference.
+    The cache is validated against the database version counter, so events
+    committed by any gunicorn worker show up here, and an idle poll is a
+    single primary-key read. The stream ends after timeout seconds and the
+    browser's EventSource reconnects, receiving a fresh snapshot.
+    """
+    current = checked_in_cache.get(class_id, day)
+    db.session.close()
+    yield 'retry: 1000\n\n'
+    yield _event('snapshot', {'checked_in': sorted(current)})
+
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < timeout:
+        time.sleep(poll_interval)
+        latest = checked_in_cache.get(class_id, day)
+        # Release the connection between polls
+        db.session.close()
+        if latest is current:
+            if time.monotonic() - last_sent >= keepalive:
+                last_sent = time.monotonic()
+                yield ': keepalive\n\n'
+            continue
+
+        for student_id in sorted(latest - current):
+            yield _event('checkin', {'student_id': student_id})
+        for student_id in sorted(current - latest):
+            yield _event('uncheck', {'student_id': student_id})
+        current = latest
+        last_sent = time.monotonic()
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select, text, union_all
+from app import db
+from app.archive import reaches_archive
+from app.models import Student, DanceClass, Attendance, ArchivedAttendance
+
+EXPORT_COLUMNS = ['date', 'time_in', 'class_id', 'class_name', 'student_id', 'first_name', 'last_name', 'email']
+
+# Rows fetched from the database cursor at a time
+FETCH_SIZE = 1000
+
+def _rows_select(model, start_date, end_date, class_id):
+    stmt = select(
+        model.date.label('date'),
+        model.time_in.label('time_in'),
+        DanceClass.id.label('class_id'),
+        DanceClass.name.label('class_name'),
+        Student.id.label('student_id'),
+        Student.first_name,
+        Student.last_name,
+        Student.email
+    ).join(Student, Student.id == model.student_id).join(
+        DanceClass, DanceClass.id == model.class_id
+    )
+    
+    if start_date:
+        stmt = stmt.where(model.date >= start_date)
+    if end_date:
+        stmt = stmt.where(model.date <= end_date)
+    if class_id:
+        stmt = stmt.where(model.class_id == class_id)
+    return stmt
+
+def attendance_rows(start_date=None, end_date=None, class_id=None):
+    """Yield export rows (in EXPORT_COLUMNS order) for the given range.
+
+    Rows are read with yield_per, which streams from a server-side cursor
+    where the database supports one, so memory use does not depend on how
+    many rows the range covers. Ranges reaching back into the archive read
+    both tables in one query.
+    """
+    stmt = _rows_select(Attendance, start_date, end_date, class_id)
+    if reaches_archive(start_date):
+        stmt = union_all(stmt, _rows_select(ArchivedAttendance, start_date, end_date, class_id))
+    stmt = stmt.order_by(text('date'), text('class_id'), text('time_in'))
+    
+    result = db.session.execute(stmt.execution_options(yield_per=FETCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+def as_csv(rows):
+    """Encode rows as CSV, one chunk per FETCH_SIZE rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([
+            row[0].isoformat(),
+            row[1].isoformat(sep=' ', timespec='seconds'),
+            *row[2:]
+        ])
+        if count % FETCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def as_ndjson(rows):
+    """Encode rows as newline-delimited JSON objects"""
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record['date'] = row[0].isoformat()
+        record['time_in'] = row[1].isoformat(timespec='seconds')
+        lines.append(json.dumps(record))
+        if len(lines) == FETCH_SIZE:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+def gzipped(chunks):
+    """Gzip a stream of byte chunks incrementally"""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,125 @@
+import csv
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import func, insert, tuple_
+from app import db
+from app.models import Student
+from app.versions import log_student_changes
+
+IMPORT_COLUMNS = ['first_name', 'last_name', 'email', 'phone']
+
+def _clean(value):
+    return (value or '').strip()
+
+def _normalize_header(name):
+    return '_'.join(_clean(name).lower().split())
+
+def read_students(lines):
+    """Yield (line_number, row) for each CSV record, streaming the input.
+
+    Headers are matched loosely ("First Name" becomes first_name) and values
+    are stripped; emails are lowercased so duplicates compare equal.
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [_normalize_header(name) for name in reader.fieldnames]
+    missing = {'first_name', 'last_name'} - set(reader.fieldnames)
+    if missing:
+        raise ValueError(f"CSV is missing required column(s): {', '.join(sorted(missing))}")
+
+    for row in reader:
+        record = {column: _clean(row.get(column)) or None for column in IMPORT_COLUMNS}
+        if record['email']:
+            record['email'] = record['email'].lower()
+        yield reader.line_num, record
+
+class ImportResult:
+    """Counts from an import run, plus a few examples of skipped rows"""
+
+    MAX_EXAMPLES = 10
+
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.skipped = Counter()
+        self.examples = []
+
+    def skip(self, line, reason):
+        self.skipped[reason] += 1
+        if len(self.examples) < self.MAX_EXAMPLES:
+            self.examples.append((line, reason))
+
+def _existing(chunk):
+    """Emails and lowercase (first, last) pairs in chunk already in the database"""
+    emails = {record['email'] for _, record in chunk if record['email']}
+    names = {(record['first_name'].lower(), record['last_name'].lower()) for _, record in chunk}
+
+    taken_emails = set()
+    if emails:
+        taken_emails = {
+            email for email, in db.session.query(func.lower(Student.email))
+            .filter(func.lower(Student.email).in_(emails))
+        }
+    first, last = func.lower(Student.first_name), func.lower(Student.last_name)
+    taken_names = set(
+        db.session.query(first, last)
+        .filter(last.in_({name[1] for name in names}))
+        .filter(tuple_(first, last).in_(names))
+    )
+    return taken_emails, taken_names
+
+def import_students(records, chunk_size=500, progress=None):
+    """Insert students from (line_number, record) pairs in chunks.
+
+    Rows without a first and last name are skipped, as are rows whose email
+    or name already exists in the database or earlier in the same file.
+    Each chunk costs two lookup queries and one multi-row insert, and is
+    committed on its own, so an interrupted import keeps the chunks already
+    written and can simply be re-run. progress(result) is called after
+    every chunk. Returns an ImportResult.
+    """
+    result = ImportResult()
+    seen_emails = set()
+    seen_names = set()
+    chunk = []
+
+    def flush():
+        taken_emails, taken_names = _existing(chunk)
+        now = datetime.utcnow()
+        rows = []
+        for line, record in chunk:
+            name = (record['first_name'].lower(), record['last_name'].lower())
+            if record['email'] and record['email'] in taken_emails:
+                result.skip(line, 'email already exists')
+            elif name in taken_names:
+                result.skip(line, 'name already exists')
+            else:
+                rows.append(dict(record, created_at=now))
+        if rows:
+            log_student_changes(db.session.scalars(insert(Student).returning(Student.id), rows).all())
+        db.session.commit()
+        result.imported += len(rows)
+        chunk.clear()
+        if progress:
+            progress(result)
+
+    for line, record in records:
+        result.read += 1
+        if not record['first_name'] or not record['last_name']:
+            result.skip(line, 'missing name')
+            continue
+        name = (record['first_name'].lower(), record['last_name'].lower())
+        if (record['email'] and record['email'] in seen_emails) or name in seen_names:
+            result.skip(line, 'duplicate in file')
+            continue
+        if record['email']:
+            seen_emails.add(record['email'])
+        seen_names.add(name)
+
+        chunk.append((line, record))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return result
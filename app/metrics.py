@@ -0,0 +1,130 @@
+import bisect
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Upper bounds of the histogram buckets (seconds, and queries per request)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    """Prometheus-style histogram with one series per endpoint"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}   # endpoint -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, endpoint, value):
+        series = self._series.get(endpoint)
+        if series is None:
+            series = self._series[endpoint] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for endpoint, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{endpoint="{endpoint}"}} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{{endpoint="{endpoint}"}} {cumulative}')
+        return lines
+
+class RequestMetrics:
+    """Per-endpoint request latency, SQL time and query count histograms.
+
+    Figures are kept per process; with several gunicorn workers each scrape
+    sees the worker that served it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duration = Histogram('checkin_request_duration_seconds',
+                                  'Time spent handling the request.', DURATION_BUCKETS)
+        self.db_time = Histogram('checkin_request_db_seconds',
+                                 'Time spent in SQL statements per request.', DURATION_BUCKETS)
+        self.queries = Histogram('checkin_request_queries',
+                                 'SQL statements issued per request.', QUERY_BUCKETS)
+        self.slow_queries = 0
+
+    def observe(self, endpoint, duration, db_time, queries):
+        with self._lock:
+            self.duration.observe(endpoint, duration)
+            self.db_time.observe(endpoint, db_time)
+            self.queries.observe(endpoint, queries)
+
+    def slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self):
+        """The metrics in Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            for histogram in (self.duration, self.db_time, self.queries):
+                lines.extend(histogram.render())
+            lines.extend([
+                '# HELP checkin_slow_queries_total SQL statements slower than SLOW_QUERY_THRESHOLD.',
+                '# TYPE checkin_slow_queries_total counter',
+                f'checkin_slow_queries_total {self.slow_queries}',
+            ])
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
+
+def init_metrics(app, engine):
+    """Time every request and SQL statement; call once the engine exists.
+
+    Each response gets a Server-Timing header (total and SQL time) and is
+    recorded in request_metrics under its endpoint. Statements slower than
+    SLOW_QUERY_THRESHOLD seconds are logged as warnings.
+    """
+    threshold = app.config['SLOW_QUERY_THRESHOLD']
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context():
+            g.sql_queries = g.get('sql_queries', 0) + 1
+            g.sql_time = g.get('sql_time', 0.0) + elapsed
+        if threshold and elapsed >= threshold:
+            request_metrics.slow_query()
+            app.logger.warning('Slow query (%.1f ms%s): %s', elapsed * 1000,
+                               f', {request.endpoint}' if has_request_context() else '',
+                               ' '.join(statement.split())[:500])
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_time = 0.0
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        queries = g.get('sql_queries', 0)
+        db_time = g.get('sql_time', 0.0)
+        request_metrics.observe(request.endpoint or 'unmatched', duration, db_time, queries)
+        if app.config['SERVER_TIMING']:
+            response.headers.add('Server-Timing', f'app;dur={duration * 1000:.1f}')
+            response.headers.add('Server-Timing', f'db;dur={db_time * 1000:.1f};desc="{queries} queries"')
+        return response
@@ -1,6 +1,15 @@
+import secrets
 from datetime import datetime
 from app import db
 
+# Check-in codes avoid characters that are easy to confuse on a printed card
+CHECKIN_CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+CHECKIN_CODE_LENGTH = 8
+
+def new_checkin_code():
+    """Random code for a student's check-in card or QR code"""
+    return ''.join(secrets.choice(CHECKIN_CODE_ALPHABET) for _ in range(CHECKIN_CODE_LENGTH))
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -13,11 +22,20 @@ class User(db.Model):
         return f'<User {self.username}>'
 
 class Student(db.Model):
+    # Keyset pagination walks students in (last_name, id) order
+    __table_args__ = (
+        db.Index('ix_student_last_name_id', 'last_name', 'id'),
+        # Scanned codes are looked up here; a separate index (rather than a
+        # column constraint) so upgrade_schema can add it to older tables
+        db.Index('uq_student_checkin_code', 'checkin_code', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(64), nullable=False)
     last_name = db.Column(db.String(64), nullable=False)
     email = db.Column(db.String(120), unique=True)
     phone = db.Column(db.String(20))
+    checkin_code = db.Column(db.String(16), default=new_checkin_code)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     attendance_records = db.relationship('Attendance', backref='student', lazy='dynamic')
     
@@ -42,13 +60,126 @@ class DanceClass(db.Model):
         return f'<DanceClass {self.name}>'
 
 class Attendance(db.Model):
+    # One check-in per student per class per day; the kiosk upsert relies on this.
+    # (class_id, date) serves the kiosk and report lookups, and class_id alone.
+    __table_args__ = (
+        db.Index('uq_attendance_student_class_date', 'student_id', 'class_id', 'date', unique=True),
+        db.Index('ix_attendance_class_id_date', 'class_id', 'date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
     class_id = db.Column(db.Integer, db.ForeignKey('dance_class.id'), nullable=False)
-    date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
+    date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date, index=True)
     time_in = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     def __repr__(self):
         return f'<Attendance {self.student_id} {self.class_id} {self.date}>'
 
+class ArchivedAttendance(db.Model):
+    """Check-ins older than the hot window, moved out of attendance.
+
+    Same columns as Attendance. `flask archive-attendance` moves
+    rows here so the attendance table only holds recent months; reports
+    and exports read from both when a date range reaches back this far.
+    """
+    __tablename__ = 'attendance_archive'
+    __table_args__ = (
+        db.Index('ix_attendance_archive_class_id_date', 'class_id', 'date'),
+        # Per-student stats are recomputed from here on every uncheck
+        db.Index('ix_attendance_archive_student_id_date', 'student_id', 'date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    class_id = db.Column(db.Integer, db.ForeignKey('dance_class.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
+    time_in = db.Column(db.DateTime, nullable=False)
+    student = db.relationship('Student', viewonly=True)
+    
+    def __repr__(self):
+        return f'<ArchivedAttendance {self.student_id} {self.class_id} {self.date}>'
+
+class StudentStats(db.Model):
+    """Attendance figures per student, kept up to date with every check-in write.
+
+    streak_weeks counts consecutive weeks with a check-in, ending with the
+    week numbered streak_week (see app.stats.week_index). Students who
+    never checked in have no row; `flask rebuild-student-stats` recomputes
+    the table from scratch.
+    """
+    __tablename__ = 'student_stats'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    last_checkin_at = db.Column(db.DateTime)
+    streak_weeks = db.Column(db.Integer, nullable=False, default=0)
+    streak_week = db.Column(db.Integer)
+    
+    def __repr__(self):
+        return f'<StudentStats {self.student_id} total={self.total}>'
+
+class CheckinReceipt(db.Model):
+    """Client-generated id of a kiosk tap that has already been replayed.
+
+    Tablets queue taps offline and may send the same batch more than once;
+    the receipt makes the replay idempotent.
+    """
+    client_id = db.Column(db.String(64), primary_key=True)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<CheckinReceipt {self.client_id}>'
+
+class DailyAttendance(db.Model):
+    """Headcount per class per day, maintained alongside every check-in write.
+
+    Lets summary views read one row per class-day instead of counting raw
+    attendance; `flask rebuild-rollups` recomputes it from scratch.
+    """
+    class_id = db.Column(db.Integer, db.ForeignKey('dance_class.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    headcount = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyAttendance {self.class_id} {self.date} {self.headcount}>'
+
+class SchemaRevision(db.Model):
+    """Fingerprint of the models a database has been upgraded to.
+
+    Lets each worker skip the schema upgrade once any one of them has done it.
+    """
+    revision = db.Column(db.String(40), primary_key=True)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaRevision {self.revision}>'
+
+class DataVersion(db.Model):
+    """Monotonic change counter for a slice of data (e.g. one class on one day).
+
+    Bumped in the same transaction as the change, so every worker can tell
+    whether its cached copy is still current with a single primary-key read.
+    """
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.key}={self.version}>'
+
+class StudentChange(db.Model):
+    """Log of which students changed at each 'students' data version.
+
+    Lets a kiosk holding an older roster fetch only the students added or
+    edited since. Rows are pruned after a while; a kiosk further behind
+    than the log reaches gets a full roster instead.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, index=True)
+    student_id = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<StudentChange {self.version} {self.student_id}>'
+
 # User loader function removed as login functionality is no longer needed
@@ -0,0 +1,50 @@
+from datetime import timedelta
+from sqlalchemy import case, func, select
+from app import db
+from app.archive import all_checkins
+from app.models import DailyAttendance
+from app.sql import dialect_insert
+
+def adjust_headcount(class_id, day, delta):
+    """Add delta to the (class, day) headcount within the current transaction."""
+    if not delta:
+        return
+    table = DailyAttendance.__table__
+    stmt = dialect_insert(table).values(class_id=class_id, date=day, headcount=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['class_id', 'date'],
+        set_={'headcount': table.c.headcount + stmt.excluded.headcount}
+    )
+    db.session.execute(stmt)
+
+def rebuild_rollups():
+    """Recompute every daily headcount from the attendance tables. Returns the row count."""
+    db.session.execute(DailyAttendance.__table__.delete())
+    # Archived check-ins count too
+    checkins = all_checkins('class_id', 'date')
+    counts = select(
+        checkins.c.class_id,
+        checkins.c.date,
+        func.count()
+    ).group_by(checkins.c.class_id, checkins.c.date)
+    result = db.session.execute(
+        DailyAttendance.__table__.insert().from_select(['class_id', 'date', 'headcount'], counts)
+    )
+    db.session.commit()
+    return result.rowcount
+
+def class_summaries(today, weeks=4):
+    """Return {class_id: (today's headcount, average headcount)} over the last weeks.
+
+    The average covers class-days with at least one check-in.
+    """
+    rows = db.session.query(
+        DailyAttendance.class_id,
+        func.sum(case((DailyAttendance.date == today, DailyAttendance.headcount), else_=0)),
+        func.avg(DailyAttendance.headcount)
+    ).filter(
+        DailyAttendance.date > today - timedelta(weeks=weeks),
+        DailyAttendance.date <= today,
+        DailyAttendance.headcount > 0
+    ).group_by(DailyAttendance.class_id)
+    return {class_id: (int(today_count or 0), float(average or 0)) for class_id, today_count, average in rows}
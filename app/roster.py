@@ -0,0 +1,111 @@
+import base64
+import json
+from sqlalchemy import func, select, tuple_
+from app import db
+from app.cache import checked_in_cache
+from app.models import Student, StudentChange
+from app.versions import STUDENTS_KEY, attendance_key, current_versions
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_values(values):
+    """Opaque URL-safe cursor holding a short list of JSON values"""
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_values(cursor, count=2):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != count:
+        raise InvalidCursor(cursor)
+    return values
+
+def encode_cursor(student):
+    """Opaque cursor pointing just after student in (last_name, id) order"""
+    return encode_values([student.last_name, student.id])
+
+def decode_cursor(cursor):
+    last_name, student_id = decode_values(cursor)
+    try:
+        return str(last_name), int(student_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+def student_page(after=None, limit=100):
+    """Return (students, next_cursor) for one page of the roster.
+
+    Pages are keyset-paginated on (last_name, id), so each page is a single
+    index range scan no matter how deep into the roster it is, and students
+    added or removed between pages are never skipped or repeated.
+    next_cursor is None on the last page.
+    """
+    query = Student.query.order_by(Student.last_name, Student.id)
+    if after:
+        query = query.filter(tuple_(Student.last_name, Student.id) > decode_cursor(after))
+    
+    students = query.limit(limit + 1).all()
+    if len(students) > limit:
+        students = students[:limit]
+        return students, encode_cursor(students[-1])
+    return students, None
+
+def _roster_version(students_version, checkins_version, day):
+    return f'{students_version}-{checkins_version}-{day:%Y%m%d}'
+
+def _parse_roster_version(version, day):
+    """Return (students_version, checkins_version) if version is from today, else None"""
+    try:
+        students_version, checkins_version, stamp = version.split('-')
+        if stamp != f'{day:%Y%m%d}':
+            return None
+        return int(students_version), int(checkins_version)
+    except (AttributeError, ValueError):
+        return None
+
+def roster_snapshot(class_id, day, since=None):
+    """Compact kiosk roster for one class on one day, or the changes since a version.
+
+    Returns a dict with an opaque 'version', 'students' as [id, first_name,
+    last_name] rows in (last_name, id) order, 'removed' ids and
+    'checked_in' ids. Without since (or if since is from another day or
+    older than the student change log) the whole roster is sent and 'full'
+    is true. Otherwise 'students' holds only the students added or edited
+    since that version, 'removed' those deleted, and 'checked_in' is null
+    when no check-ins changed.
+    """
+    versions = current_versions([STUDENTS_KEY, attendance_key(class_id, day)])
+    students_version = versions[STUDENTS_KEY]
+    checkins_version = versions[attendance_key(class_id, day)]
+    snapshot = {
+        'version': _roster_version(students_version, checkins_version, day),
+        'full': True,
+        'students': [],
+        'removed': [],
+        'checked_in': None
+    }
+    columns = (Student.id, Student.first_name, Student.last_name)
+    
+    previous = _parse_roster_version(since, day) if since else None
+    if previous and previous[0] < students_version:
+        oldest = db.session.query(func.min(StudentChange.version)).scalar()
+        if oldest is None or previous[0] < oldest - 1:
+            previous = None
+    
+    if previous is None:
+        snapshot['students'] = [list(row) for row in db.session.query(*columns).order_by(Student.last_name, Student.id)]
+    else:
+        snapshot['full'] = False
+        if previous[0] < students_version:
+            changed = select(StudentChange.student_id).where(StudentChange.version > previous[0])
+            found = db.session.query(*columns).filter(Student.id.in_(changed)).order_by(Student.last_name, Student.id).all()
+            snapshot['students'] = [list(row) for row in found]
+            present = {row[0] for row in found}
+            snapshot['removed'] = sorted(set(db.session.scalars(changed.distinct())) - present)
+    
+    if previous is None or previous[1] != checkins_version:
+        snapshot['checked_in'] = sorted(checked_in_cache.get(class_id, day))
+    return snapshot
@@ -1,11 +1,23 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
-from app.models import User, Student, DanceClass, Attendance
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, Response, stream_with_context
+from app.models import User, Student, DanceClass, DailyAttendance
 from app import db
+from app.archive import day_records
+from app.conditional import conditional_get
+from app.export import as_csv, as_ndjson, attendance_rows, gzipped
 from app.forms import StudentForm, ClassForm
+from app.metrics import request_metrics
+from app.rollup import class_summaries
+from app.roster import InvalidCursor
+from app.schedule import weekly_schedule
+from app.search import student_index
+from app.stats import STUDENT_SORTS, streak_now, student_stats_page
+from app.versions import ATTENDANCE_KEY, CLASSES_KEY
 from datetime import datetime, date, timedelta
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+STUDENTS_PER_PAGE = 100
+
 @bp.route('/')
 def index():
     """Admin dashboard"""
@@ -19,9 +31,21 @@ def users():
 
 @bp.route('/students')
 def students():
-    """Manage students"""
-    students = Student.query.order_by(Student.last_name).all()
-    return render_template('admin/students.html', students=students)
+    """Manage students, one keyset page at a time, with their attendance stats"""
+    after = request.args.get('after')
+    sort = request.args.get('sort', 'name')
+    if sort not in STUDENT_SORTS:
+        abort(400)
+    try:
+        rows, next_cursor = student_stats_page(sort=sort, after=after, limit=STUDENTS_PER_PAGE)
+    except InvalidCursor:
+        abort(400)
+    return render_template('admin/students.html',
+                          rows=rows,
+                          sort=sort,
+                          streak_now=streak_now,
+                          next_cursor=next_cursor,
+                          first_page=not after)
 
 @bp.route('/student/new', methods=['GET', 'POST'])
 def new_student():
@@ -42,6 +66,7 @@ def new_student():
         )
         db.session.add(student)
         db.session.commit()
+        student_index.add_or_update(student)
         flash(f'Student {student.full_name} has been added!', 'success')
         return redirect(url_for('admin.students'))
     
@@ -60,7 +85,8 @@ def edit_student(id):
         # Check if email is being changed and already exists
         if email and email != student.email and Student.query.filter_by(email=email).first():
             flash('A student with this email already exists.', 'error')
-            return render_template('admin/student_form.html', form=form, title='Edit Student')
+            return render_template('admin/student_form.html', form=form, title='Edit Student',
+                                   checkin_code=student.checkin_code)
         
         student.first_name = form.first_name.data
         student.last_name = form.last_name.data
@@ -68,19 +94,25 @@ def edit_student(id):
         student.phone = form.phone.data
         
         db.session.commit()
+        student_index.add_or_update(student)
         flash(f'Student {student.full_name} has been updated!', 'success')
         return redirect(url_for('admin.students'))
     
-    return render_template('admin/student_form.html', form=form, title='Edit Student')
+    return render_template('admin/student_form.html', form=form, title='Edit Student',
+                           checkin_code=student.checkin_code)
 
 @bp.route('/classes')
+@conditional_get(lambda: [CLASSES_KEY, ATTENDANCE_KEY])
 def classes():
     """Manage dance classes"""
     # Show all classes
     classes = DanceClass.query.all()
     today = date.today()
     
-    return render_template('admin/classes.html', classes=classes, today=today)
+    return render_template('admin/classes.html',
+                          classes=classes,
+                          today=today,
+                          summaries=class_summaries(today))
 
 @bp.route('/class/new', methods=['GET', 'POST'])
 def new_class():
@@ -99,6 +131,7 @@ def new_class():
         )
         db.session.add(dance_class)
         db.session.commit()
+        weekly_schedule.invalidate()
         flash(f'Class {dance_class.name} has been added!', 'success')
         return redirect(url_for('admin.classes'))
     
@@ -119,11 +152,17 @@ def edit_class(id):
         dance_class.description = form.description.data
         
         db.session.commit()
+        weekly_schedule.invalidate()
         flash(f'Class {dance_class.name} has been updated!', 'success')
         return redirect(url_for('admin.classes'))
     
     return render_template('admin/class_form.html', form=form, title='Edit Class')
 
+@bp.route('/metrics')
+def metrics():
+    """Request latency and query histograms for this worker, in Prometheus text format"""
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @bp.route('/attendance/report')
 def attendance_report():
     """View attendance reports"""
@@ -147,33 +186,31 @@ def attendance_report():
     # Show all classes
     classes = DanceClass.query.all()
     
-    # If class_id is specified, filter attendance for that class
+    # If class_id is specified, count attendance per date for that class
     attendance_data = []
     if class_id:
         dance_class = DanceClass.query.get_or_404(class_id)
         
-        # Get attendance records for the specified class and date range
-        attendance_records = Attendance.query.filter(
-            Attendance.class_id == class_id,
-            Attendance.date >= start_date,
-            Attendance.date <= end_date
-        ).order_by(Attendance.date.desc()).all()
-        
-        # Group by date
-        attendance_by_date = {}
-        for record in attendance_records:
-            if record.date not in attendance_by_date:
-                attendance_by_date[record.date] = []
-            attendance_by_date[record.date].append(record)
+        # Per-date headcounts come from the daily rollup
+        counts = db.session.query(DailyAttendance.date, DailyAttendance.headcount).filter(
+            DailyAttendance.class_id == class_id,
+            DailyAttendance.date >= start_date,
+            DailyAttendance.date <= end_date,
+            DailyAttendance.headcount > 0
+        ).order_by(DailyAttendance.date.desc()).all()
         
         attendance_data = [
             {
                 'date': date_obj,
-                'count': len(records),
-                'records': records
+                'count': count,
+                'records': None
             }
-            for date_obj, records in sorted(attendance_by_date.items(), key=lambda x: x[0], reverse=True)
+            for date_obj, count in counts
         ]
+        
+        # The most recent date is shown expanded; the rest load on demand
+        if attendance_data:
+            attendance_data[0]['records'] = day_records(class_id, attendance_data[0]['date'])
     
     return render_template(
         'admin/attendance_report.html',
@@ -183,3 +220,47 @@ def attendance_report():
         end_date=end_date,
         attendance_data=attendance_data
     )
+
+@bp.route('/attendance/report/<int:class_id>/<day>')
+def attendance_report_day(class_id, day):
+    """Check-in rows for one class on one date, loaded when a report date is expanded"""
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').date()
+    except ValueError:
+        abort(404)
+    
+    records = day_records(class_id, day)
+    return render_template('admin/attendance_rows.html', records=records)
+
+@bp.route('/attendance/export')
+def attendance_export():
+    """Stream attendance for a date range as CSV or NDJSON, optionally gzipped"""
+    class_id = request.args.get('class_id', type=int)
+    export_format = request.args.get('format', 'csv')
+    compress = request.args.get('gzip', type=int) == 1
+    
+    if export_format not in ('csv', 'ndjson'):
+        abort(400)
+    
+    # Both ends of the range are optional
+    try:
+        start_date = request.args.get('start_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = request.args.get('end_date')
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        abort(400)
+    
+    rows = attendance_rows(start_date, end_date, class_id)
+    if export_format == 'csv':
+        body, mimetype = as_csv(rows), 'text/csv'
+    else:
+        body, mimetype = as_ndjson(rows), 'application/x-ndjson'
+    
+    filename = f'attendance.{export_format}'
+    if compress:
+        body, mimetype, filename = gzipped(body), 'application/gzip', filename + '.gz'
+    
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
@@ -1,157 +1,274 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from datetime import datetime, date
-from app.models import Student, DanceClass, Attendance, User
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, current_app, stream_with_context
+from datetime import datetime, date, timedelta
+from app.models import Student, DanceClass, User
 from app import db
+from app.analytics import WEEKDAYS, analytics_cache
+from app.cache import checked_in_cache
+from app.checkin import record_checkin, record_checkins, remove_checkin, replay_checkins
+from app.conditional import conditional_get
+from app.events import checkin_events
+from app.rollup import class_summaries
+from app.roster import InvalidCursor, roster_snapshot, student_page
+from app.schedule import weekly_schedule
+from app.search import student_index
+from app.versions import ATTENDANCE_KEY, CLASSES_KEY, STUDENTS_KEY, attendance_key
+from app.writebehind import get_checkin_writer
 
 bp = Blueprint('main', __name__)
 
+# Largest batch of queued kiosk taps accepted by replay_checkins_batch
+MAX_REPLAY_BATCH = 500
+
+def _roster_keys():
+    """Version keys behind a roster response: the students, plus check-ins if a class is given"""
+    class_id = request.args.get('class_id', type=int)
+    if class_id:
+        return [STUDENTS_KEY, attendance_key(class_id, date.today())]
+    return [STUDENTS_KEY]
+
+def _check_in(student_id, class_id):
+    """Check a student in now and return (time_in, created).
+    
+    Goes through the write-behind queue when CHECKIN_WRITE_BEHIND is on;
+    otherwise the check-in is committed before returning.
+    """
+    now = datetime.now()
+    writer = get_checkin_writer(current_app._get_current_object())
+    if writer is not None:
+        return writer.submit(student_id, class_id, now)
+    time_in, created = record_checkin(student_id, class_id, now.date(), now)
+    db.session.commit()
+    return time_in, created
+
 @bp.route('/')
+@conditional_get(lambda: [CLASSES_KEY])
 def index():
     """Home page - kiosk mode for students to mark attendance"""
     today = date.today()
-    # Get classes for today
-    today_classes = DanceClass.query.filter_by(day_of_week=today.strftime('%A')).all()
+    # Get classes for today from the in-memory schedule
+    today_classes = weekly_schedule.classes_on(today)
     return render_template('index.html', classes=today_classes, today=today)
 
+@bp.route('/kiosk/now')
+def kiosk_now():
+    """Open the kiosk for whichever class is in session right now"""
+    early = timedelta(minutes=current_app.config['KIOSK_OPENS_EARLY_MINUTES'])
+    dance_class = weekly_schedule.in_session(datetime.now(), early=early)
+    if dance_class is None:
+        flash('No class is in session right now. Please pick your class.', 'info')
+        return redirect(url_for('main.index'))
+    return redirect(url_for('main.kiosk', class_id=dance_class.id))
+
 @bp.route('/kiosk/<int:class_id>')
 def kiosk(class_id):
     """Kiosk mode for a specific class"""
     dance_class = DanceClass.query.get_or_404(class_id)
-    students = Student.query.order_by(Student.last_name).all()
     today = date.today()
     
     # Get students who have already checked in
-    checked_in = Attendance.query.filter_by(
-        class_id=class_id,
-        date=today
-    ).with_entities(Attendance.student_id).all()
-    
-    checked_in_ids = [record[0] for record in checked_in]
+    checked_in_ids = checked_in_cache.get(class_id, today)
     
+    # The roster itself is paged in by the page through list_students
     return render_template('kiosk.html', 
                           dance_class=dance_class, 
-                          students=students, 
                           checked_in_ids=checked_in_ids,
-                          today=today)
+                          today=today,
+                          live_events=current_app.config['KIOSK_EVENTS'],
+                          poll_interval=current_app.config['KIOSK_POLL_INTERVAL'])
+
+@bp.route('/kiosk/<int:class_id>/roster')
+@conditional_get(lambda class_id: [STUDENTS_KEY, attendance_key(class_id, date.today())])
+def kiosk_roster(class_id):
+    """Compact roster for the kiosk; ?since=<version> returns only what changed"""
+    DanceClass.query.get_or_404(class_id)
+    return jsonify(roster_snapshot(class_id, date.today(), since=request.args.get('since')))
+
+@bp.route('/kiosk/<int:class_id>/events')
+def kiosk_events(class_id):
+    """Server-Sent Events stream of check-ins and un-checks for a class"""
+    DanceClass.query.get_or_404(class_id)
+    if not current_app.config['KIOSK_EVENTS']:
+        # Tells the browser's EventSource to stop reconnecting
+        return '', 204
+    events = checkin_events(
+        class_id,
+        date.today(),
+        poll_interval=current_app.config['KIOSK_EVENTS_POLL_INTERVAL'],
+        timeout=current_app.config['KIOSK_EVENTS_TIMEOUT']
+    )
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @bp.route('/mark_attendance', methods=['POST'])
 def mark_attendance():
     """Mark attendance for a student"""
-    student_id = request.form.get('student_id')
-    class_id = request.form.get('class_id')
+    student_id = request.form.get('student_id', type=int)
+    class_id = request.form.get('class_id', type=int)
     
     if not student_id or not class_id:
         flash('Missing required information', 'error')
         return redirect(request.referrer)
     
-    # Check if student is already marked for today
-    today = date.today()
-    existing = Attendance.query.filter_by(
-        student_id=student_id,
-        class_id=class_id,
-        date=today
-    ).first()
-    
-    student = Student.query.get(student_id)
-    dance_class = DanceClass.query.get(class_id)
+    # Look up the student and class together
+    found = db.session.query(Student, DanceClass).join(
+        DanceClass, DanceClass.id == class_id
+    ).filter(Student.id == student_id).first()
     
-    if not student or not dance_class:
+    if not found:
         flash('Invalid student or class', 'error')
         return redirect(request.referrer)
     
-    if existing:
-        # Already checked in, just show confirmation
-        return render_template('attendance_confirmation.html', 
-                              student=student, 
-                              dance_class=dance_class, 
-                              already_checked_in=True,
-                              time=existing.time_in)
+    student, dance_class = found
+    
+    # Insert the check-in, or get the existing one if already checked in today
+    time_in, created = _check_in(student_id, class_id)
+    
+    # Show confirmation page
+    return render_template('attendance_confirmation.html', 
+                          student=student, 
+                          dance_class=dance_class, 
+                          already_checked_in=not created,
+                          time=time_in)
+
+@bp.route('/checkin/scan', methods=['POST'])
+def scan_checkin():
+    """Check a student in from a scanned card or QR code.
+    
+    Takes the code and class as JSON or form data. One indexed lookup finds
+    the student and confirms the class, then the check-in is recorded like a
+    tap, so a scanner needs no roster or search requests at all.
+    """
+    data = request.get_json(silent=True) or request.form.to_dict()
+    code = str(data.get('code') or '').strip().upper()
+    try:
+        class_id = int(data.get('class_id'))
+    except (TypeError, ValueError):
+        class_id = None
+    
+    if not code or not class_id:
+        return jsonify({'success': False, 'message': 'Missing required information'}), 400
+    
+    found = db.session.query(Student.id, Student.first_name, Student.last_name, DanceClass.name).join(
+        DanceClass, DanceClass.id == class_id
+    ).filter(Student.checkin_code == code).first()
+    
+    if not found:
+        return jsonify({'success': False, 'message': 'Unknown check-in code'}), 404
+    
+    time_in, created = _check_in(found.id, class_id)
+    
+    name = f'{found.first_name} {found.last_name}'
+    if created:
+        message = f'{name} is checked in to {found.name}!'
     else:
-        # Create new attendance record
-        attendance = Attendance(
-            student_id=student_id,
-            class_id=class_id,
-            date=today,
-            time_in=datetime.now()
-        )
-        db.session.add(attendance)
-        db.session.commit()
-        
-        # Show confirmation page
-        return render_template('attendance_confirmation.html', 
-                              student=student, 
-                              dance_class=dance_class, 
-                              already_checked_in=False,
-                              time=attendance.time_in)
+        message = f'{name} already checked in at {time_in.strftime("%I:%M %p")}'
+    return jsonify({
+        'success': True,
+        'already_checked_in': not created,
+        'message': message,
+        'student': {'id': found.id, 'name': name, 'checked_in': True}
+    })
 
 @bp.route('/search_students')
+@conditional_get(_roster_keys)
 def search_students():
     """API endpoint to search for students by name"""
     query = request.args.get('query', '')
-    class_id = request.args.get('class_id')
+    class_id = request.args.get('class_id', type=int)
     
-    # If query is empty, return all students (limited to 100)
+    # If query is empty, return the first page of the roster
+    next_cursor = None
     if not query:
-        students = Student.query.order_by(Student.last_name).limit(100).all()
+        page, next_cursor = student_page(limit=100)
+        students = [(student.id, student.full_name) for student in page]
     else:
-        # Search for students by name
-        students = Student.query.filter(
-            (Student.first_name.ilike(f'%{query}%') | 
-             Student.last_name.ilike(f'%{query}%'))
-        ).order_by(Student.last_name).limit(20).all()
+        # Search for students by name using the in-memory name index
+        students = student_index.search(query, limit=20)
     
     today = date.today()
     
     # Get students who have already checked in for this class
-    checked_in = []
+    checked_in = frozenset()
     if class_id:
-        checked_in = Attendance.query.filter_by(
-            class_id=class_id,
-            date=today
-        ).with_entities(Attendance.student_id).all()
-        checked_in = [record[0] for record in checked_in]
+        checked_in = checked_in_cache.get(class_id, today)
     
     # Format student data for JSON response
     student_list = [{
-        'id': student.id,
-        'name': student.full_name,
-        'checked_in': student.id in checked_in
-    } for student in students]
+        'id': student_id,
+        'name': name,
+        'checked_in': student_id in checked_in
+    } for student_id, name in students]
+    
+    return jsonify({'students': student_list, 'next_cursor': next_cursor})
+
+@bp.route('/students')
+@conditional_get(_roster_keys)
+def list_students():
+    """API endpoint listing the whole roster in (last name, id) order, one page at a time"""
+    after = request.args.get('after')
+    limit = min(request.args.get('limit', 200, type=int), 500)
+    class_id = request.args.get('class_id', type=int)
+    
+    try:
+        students, next_cursor = student_page(after=after, limit=max(limit, 1))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     
-    return jsonify({'students': student_list})
+    checked_in = checked_in_cache.get(class_id, date.today()) if class_id else frozenset()
+    
+    return jsonify({
+        'students': [{
+            'id': student.id,
+            'name': student.full_name,
+            'checked_in': student.id in checked_in
+        } for student in students],
+        'next_cursor': next_cursor
+    })
 
 @bp.route('/uncheck_attendance', methods=['POST'])
 def uncheck_attendance():
     """Un-check attendance for a student"""
-    student_id = request.form.get('student_id')
-    class_id = request.form.get('class_id')
+    student_id = request.form.get('student_id', type=int)
+    class_id = request.form.get('class_id', type=int)
     
     if not student_id or not class_id:
         flash('Missing required information', 'error')
         return redirect(request.referrer)
     
-    # Find the attendance record for today
-    today = date.today()
-    attendance = Attendance.query.filter_by(
-        student_id=student_id,
-        class_id=class_id,
-        date=today
-    ).first()
-    
-    student = Student.query.get(student_id)
-    dance_class = DanceClass.query.get(class_id)
+    # Look up the student and class together
+    found = db.session.query(Student, DanceClass).join(
+        DanceClass, DanceClass.id == class_id
+    ).filter(Student.id == student_id).first()
     
-    if not student or not dance_class:
+    if not found:
         flash('Invalid student or class', 'error')
         return redirect(request.referrer)
     
-    if attendance:
-        # Delete the attendance record
-        db.session.delete(attendance)
-        db.session.commit()
-        flash(f'{student.full_name} has been un-checked in from {dance_class.name}', 'success')
+    student, dance_class = found
+    
+    # Drop a check-in this worker still has queued, then delete today's
+    # attendance record, if any
+    now = datetime.now()
+    writer = get_checkin_writer(current_app._get_current_object())
+    cancelled = writer is not None and writer.cancel(student_id, class_id, now.date())
+    removed = remove_checkin(student_id, class_id, now.date(), now) or cancelled
+    db.session.commit()
+    if removed:
+        message, category = f'{student.full_name} has been un-checked in from {dance_class.name}', 'success'
     else:
-        flash(f'{student.full_name} was not checked in today', 'warning')
+        message, category = f'{student.full_name} was not checked in today', 'warning'
+    
+    # The kiosk un-checks over AJAX and patches its roster in place
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            'success': removed,
+            'message': message,
+            'student': {'id': student.id, 'name': student.full_name, 'checked_in': False}
+        })
+    
+    flash(message, category)
     
     # Redirect back to the kiosk page
     return redirect(url_for('main.kiosk', class_id=class_id))
@@ -171,39 +288,13 @@ def mark_attendance_batch():
     if not dance_class:
         return jsonify({'success': False, 'message': 'Invalid class'})
     
-    today = date.today()
-    now = datetime.now()
-    checked_in_students = []
-    
-    for student_id in student_ids:
-        # Check if student exists
-        student = Student.query.get(student_id)
-        if not student:
-            continue
-        
-        # Check if student is already marked for today
-        existing = Attendance.query.filter_by(
-            student_id=student_id,
-            class_id=class_id,
-            date=today
-        ).first()
-        
-        if not existing:
-            # Create new attendance record
-            attendance = Attendance(
-                student_id=student_id,
-                class_id=class_id,
-                date=today,
-                time_in=now
-            )
-            db.session.add(attendance)
-            
-            # Add to checked in students list
-            checked_in_students.append({
-                'id': student.id,
-                'name': student.full_name,
-                'checked_in': True
-            })
+    # Validate, de-duplicate and insert the whole batch in a constant number of queries
+    new_students = record_checkins(student_ids, class_id, date.today(), datetime.now())
+    checked_in_students = [{
+        'id': student.id,
+        'name': student.full_name,
+        'checked_in': True
+    } for student in new_students]
     
     # Commit all changes at once
     db.session.commit()
@@ -214,11 +305,49 @@ def mark_attendance_batch():
         'students': checked_in_students
     })
 
+@bp.route('/checkins/replay', methods=['POST'])
+def replay_checkins_batch():
+    """Apply check-ins queued by a kiosk while offline.
+    
+    Each tap carries a client-generated id so a batch can be resent safely,
+    and its original tap time (milliseconds since the epoch) becomes time_in.
+    """
+    data = request.get_json(silent=True) or {}
+    
+    taps = []
+    for tap in data.get('checkins', []):
+        try:
+            taps.append((
+                str(tap['client_id'])[:64],
+                int(tap['student_id']),
+                int(tap['class_id']),
+                datetime.fromtimestamp(int(tap['tapped_at']) / 1000)
+            ))
+        except (KeyError, TypeError, ValueError, OverflowError, OSError):
+            return jsonify({'success': False, 'message': 'Malformed check-in'}), 400
+    
+    if len(taps) > MAX_REPLAY_BATCH:
+        return jsonify({'success': False, 'message': f'At most {MAX_REPLAY_BATCH} check-ins per batch'}), 400
+    
+    statuses = replay_checkins(taps, datetime.now())
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'results': [{'client_id': client_id, 'status': status} for client_id, status in statuses.items()]
+    })
+
 @bp.route('/dashboard')
+@conditional_get(lambda: [CLASSES_KEY, ATTENDANCE_KEY], stamp=analytics_cache.version)
 def dashboard():
     """Dashboard for instructors and admins"""
     # Show all classes (no login required)
     classes = DanceClass.query.all()
     today = date.today()
     
-    return render_template('dashboard.html', classes=classes, today=today)
+    return render_template('dashboard.html',
+                          classes=classes,
+                          today=today,
+                          summaries=class_summaries(today),
+                          analytics=analytics_cache.get(today),
+                          weekdays=WEEKDAYS)
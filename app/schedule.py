@@ -0,0 +1,74 @@
+import threading
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from app import db
+from app.models import DanceClass
+from app.versions import CLASSES_KEY, current_version, request_version
+
+# The columns the home page and kiosk need; attribute names match DanceClass
+ScheduledClass = namedtuple('ScheduledClass', [
+    'id', 'name', 'instructor_name', 'day_of_week', 'start_time', 'end_time', 'description'
+])
+
+class WeeklySchedule:
+    """Process-local copy of the weekly class timetable, by day of week.
+
+    Answers "classes on this day" and "class running at this time" from
+    memory. It is loaded lazily and reloaded whenever the 'classes' data
+    version moves, so a class change committed by any worker is seen on the
+    next lookup, and pages whose ETag covers that version never outlive it.
+    Checking the version costs nothing on pages served through
+    conditional_get and one primary-key read per lookup elsewhere.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None    # 'classes' version the copy was loaded at
+        self._by_day = {}
+
+    def rebuild(self, version=None):
+        """Reload every class from the database."""
+        if version is None:
+            version = current_version(CLASSES_KEY)
+        rows = db.session.query(*(getattr(DanceClass, column) for column in ScheduledClass._fields)).all()
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[row.day_of_week].append(ScheduledClass(*row))
+        for classes in by_day.values():
+            classes.sort(key=lambda c: (c.start_time, c.name))
+        with self._lock:
+            self._by_day = dict(by_day)
+            self._version = version
+
+    def invalidate(self):
+        """Force a reload on the next lookup."""
+        self._version = None
+
+    def _ensure_fresh(self):
+        # Read the version before the rows, so a change landing in between
+        # triggers another reload rather than being missed. Within a
+        # conditional GET this is the version already read for the ETag.
+        version = request_version(CLASSES_KEY)
+        if self._version != version:
+            self.rebuild(version)
+
+    def classes_on(self, day):
+        """Classes meeting on day's weekday, by start time"""
+        self._ensure_fresh()
+        return list(self._by_day.get(day.strftime('%A'), ()))
+
+    def in_session(self, at, early=timedelta(0)):
+        """The class running at datetime at, or None.
+
+        A class counts from early before its start until its end, so the
+        kiosk can open for check-in ahead of time. If several overlap, the
+        one that started most recently wins.
+        """
+        current = None
+        for dance_class in self.classes_on(at):
+            opens = datetime.combine(at.date(), dance_class.start_time) - early
+            if opens <= at <= datetime.combine(at.date(), dance_class.end_time):
+                current = dance_class
+        return current
+
+weekly_schedule = WeeklySchedule()
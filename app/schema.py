@@ -0,0 +1,129 @@
+import hashlib
+from contextlib import contextmanager
+from sqlalchemy import bindparam, inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import Student, Attendance, ArchivedAttendance, SchemaRevision, new_checkin_code
+from app.rollup import rebuild_rollups
+from app.stats import rebuild_stats
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Indexes made redundant by later ones
+OBSOLETE_INDEXES = ['ix_attendance_class_id']
+
+def upgrade_schema():
+    """Create missing tables and bring existing ones up to the current models.
+
+    db.create_all() only creates tables that don't exist yet, so indexes added
+    to an existing table, and data derived for a new table, are handled here.
+    """
+    had_rollups = inspect(db.engine).has_table('daily_attendance')
+    had_stats = inspect(db.engine).has_table('student_stats')
+    db.create_all()
+
+    inspector = inspect(db.engine)
+    if 'checkin_code' not in {column['name'] for column in inspector.get_columns('student')}:
+        db.session.execute(text('ALTER TABLE student ADD COLUMN checkin_code VARCHAR(16)'))
+        db.session.commit()
+    backfill_checkin_codes()
+
+    existing = {
+        index['name']
+        for table in ('student', 'attendance', 'attendance_archive')
+        for index in inspector.get_indexes(table)
+    }
+    if 'uq_attendance_student_class_date' not in existing:
+        # Older databases may hold duplicate check-ins; keep the earliest one
+        db.session.execute(text(
+            'DELETE FROM attendance WHERE id NOT IN ('
+            'SELECT MIN(id) FROM attendance GROUP BY student_id, class_id, date)'
+        ))
+        db.session.commit()
+
+    for model in (Student, Attendance, ArchivedAttendance):
+        for index in model.__table__.indexes:
+            if index.name not in existing:
+                index.create(db.engine, checkfirst=True)
+
+    for name in OBSOLETE_INDEXES:
+        if name in existing:
+            db.session.execute(text(f'DROP INDEX {name}'))
+            db.session.commit()
+
+    # Derived tables are backfilled last, from de-duplicated check-ins
+    if not had_rollups:
+        # Backfill headcounts for check-ins recorded before the rollup existed
+        rebuild_rollups()
+    if not had_stats:
+        rebuild_stats()
+
+def backfill_checkin_codes():
+    """Give every student without a check-in code a new one. Returns the count."""
+    table = Student.__table__
+    ids = [row[0] for row in db.session.execute(
+        select(table.c.id).where(table.c.checkin_code.is_(None))
+    )]
+    if ids:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('student_id')).values(checkin_code=bindparam('code')),
+            [{'student_id': student_id, 'code': new_checkin_code()} for student_id in ids]
+        )
+        db.session.commit()
+    return len(ids)
+
+def schema_fingerprint():
+    """Hash of every table, column and index the models define"""
+    parts = []
+    for table in sorted(db.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f'{column.name}:{column.type}' for column in table.columns)
+        parts.extend(sorted(
+            f"{index.name}:{','.join(c.name for c in index.columns)}:{index.unique}"
+            for index in table.indexes
+        ))
+    parts.extend(OBSOLETE_INDEXES)
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+def _is_applied(revision):
+    try:
+        return db.session.get(SchemaRevision, revision) is not None
+    except SQLAlchemyError:
+        # No schema_revision table yet
+        db.session.rollback()
+        return False
+
+@contextmanager
+def _file_lock(path):
+    """Serialize schema upgrades between workers on the same host"""
+    if fcntl is None or path is None:
+        yield
+        return
+    with open(path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def ensure_schema(lock_path=None):
+    """Upgrade the schema unless this database is already at the current revision.
+
+    The common case, a worker starting against an up-to-date database, costs
+    a single primary-key lookup. Returns True if an upgrade was run.
+    """
+    revision = schema_fingerprint()
+    if _is_applied(revision):
+        return False
+    
+    with _file_lock(lock_path):
+        # Another worker may have finished the upgrade while we waited
+        if _is_applied(revision):
+            return False
+        upgrade_schema()
+        db.session.add(SchemaRevision(revision=revision))
+        db.session.commit()
+    return True
@@ -0,0 +1,202 @@
+import heapq
+import re
+import threading
+from collections import defaultdict
+from sqlalchemy import func, select
+from app import db
+from app.models import Student, StudentChange
+from app.versions import STUDENTS_KEY, current_version, request_version
+
+_SPLIT = re.compile(r"[\s\-']+")
+
+# Longest token prefix kept in the prefix map; longer words are checked directly
+MAX_PREFIX = 12
+
+def _normalize(text):
+    return ' '.join((text or '').lower().split())
+
+def _tokens(key):
+    return [token for token in _SPLIT.split(key) if token]
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class StudentNameIndex:
+    """Process-local index over student names for the kiosk search box.
+
+    Each name is indexed by token prefixes (for "type the start of a name")
+    and by trigrams of the full lowercase name (for substring matches), so a
+    lookup touches a handful of sets instead of scanning the student table.
+
+    The index is loaded lazily from the database and kept at the 'students'
+    data version: when the version moves, only the students in the change
+    log since the loaded version are re-read (or everything, if the log no
+    longer reaches back that far). Search results therefore never lag the
+    ETag of the page they are served on, whichever worker made the change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None    # 'students' version the index was loaded at
+        self._reset()
+
+    def _reset(self):
+        self._names = {}        # id -> (first_name, last_name, key)
+        self._words = defaultdict(set)
+        self._prefixes = defaultdict(set)
+        self._trigrams = defaultdict(set)
+        self._order = None      # id -> position in (last, first) order
+
+    def _add(self, student_id, first_name, last_name):
+        key = _normalize(f'{first_name} {last_name}')
+        self._names[student_id] = (first_name, last_name, key)
+        for token in _tokens(key):
+            self._words[token].add(student_id)
+            for end in range(1, min(len(token), MAX_PREFIX) + 1):
+                self._prefixes[token[:end]].add(student_id)
+        for gram in _trigrams(key):
+            self._trigrams[gram].add(student_id)
+        self._order = None
+
+    def _remove(self, student_id):
+        entry = self._names.pop(student_id, None)
+        if entry is None:
+            return
+        key = entry[2]
+        for token in _tokens(key):
+            self._words[token].discard(student_id)
+            for end in range(1, min(len(token), MAX_PREFIX) + 1):
+                self._prefixes[token[:end]].discard(student_id)
+        for gram in _trigrams(key):
+            self._trigrams[gram].discard(student_id)
+        self._order = None
+
+    def rebuild(self, version=None):
+        """Reload every student name from the database."""
+        if version is None:
+            version = current_version(STUDENTS_KEY)
+        rows = db.session.query(Student.id, Student.first_name, Student.last_name).all()
+        with self._lock:
+            self._reset()
+            for student_id, first_name, last_name in rows:
+                self._add(student_id, first_name, last_name)
+            self._version = version
+
+    def _catch_up(self, since, version):
+        """Re-read the students changed after version since; False if the log is too short."""
+        oldest = db.session.query(func.min(StudentChange.version)).scalar()
+        if oldest is None or since < oldest - 1:
+            return False
+        changed = set(db.session.scalars(
+            select(StudentChange.student_id).where(StudentChange.version > since).distinct()
+        ))
+        rows = db.session.query(Student.id, Student.first_name, Student.last_name).filter(
+            Student.id.in_(changed)
+        ).all()
+        with self._lock:
+            for student_id in changed:
+                self._remove(student_id)
+            for student_id, first_name, last_name in rows:
+                self._add(student_id, first_name, last_name)
+            self._version = version
+        return True
+
+    def invalidate(self):
+        """Force a full reload on the next search."""
+        self._version = None
+
+    def add_or_update(self, student):
+        """Patch a single student after it has been committed."""
+        with self._lock:
+            if self._version is None:
+                return
+            self._remove(student.id)
+            self._add(student.id, student.first_name, student.last_name)
+
+    def _ensure_fresh(self):
+        # Read the version before the rows, so a change landing in between
+        # is applied again next time rather than being missed. Within a
+        # conditional GET this is the version already read for the ETag.
+        version = request_version(STUDENTS_KEY)
+        if self._version == version:
+            return
+        if self._version is None or not self._catch_up(self._version, version):
+            self.rebuild(version)
+
+    def _alphabetical(self):
+        if self._order is None:
+            ordered = sorted(self._names, key=lambda i: (
+                self._names[i][1].lower(), self._names[i][0].lower(), i
+            ))
+            self._order = {student_id: position for position, student_id in enumerate(ordered)}
+        return self._order
+
+    def _score(self, term):
+        """Return a function scoring an id 0 (word), 1 (word prefix) or 2 for term"""
+        words = self._words.get(term, ())
+        if len(term) <= MAX_PREFIX:
+            prefixes = self._prefixes.get(term, ())
+            return lambda i: 0 if i in words else 1 if i in prefixes else 2
+        return lambda i: 0 if i in words else 1 if any(
+            token.startswith(term) for token in _tokens(self._names[i][2])) else 2
+
+    def _matching(self, term):
+        """Ids matching one query word.
+
+        One- and two-letter words match the start of a name word; longer
+        words match anywhere in the name.
+        """
+        if len(term) < 3:
+            return set(self._prefixes.get(term, ()))
+        grams = sorted((self._trigrams.get(g, set()) for g in _trigrams(term)), key=len)
+        candidates = set.intersection(*grams)
+        if len(term) == 3:
+            return candidates
+        return {i for i in candidates if term in self._names[i][2]}
+
+    def search(self, query, limit=20):
+        """Return up to limit (id, full_name) pairs matching query, best first.
+
+        Every word of the query must match the student's name (see _matching).
+        Results rank exact word matches over word prefixes over plain
+        substrings, then alphabetically by last name.
+        """
+        terms = _normalize(query).split()
+        if not terms:
+            return []
+
+        self._ensure_fresh()
+        with self._lock:
+            matches = None
+            for term in sorted(terms, key=len, reverse=True):
+                found = self._matching(term)
+                matches = found if matches is None else matches & found
+                if not matches:
+                    return []
+
+            order = self._alphabetical()
+            if len(terms) > 1:
+                scorers = [self._score(term) for term in terms]
+                best = heapq.nsmallest(limit, matches, key=lambda i: (
+                    sum(score(i) for score in scorers), order[i]
+                ))
+            else:
+                # Single word (the common case while typing): rank by buckets
+                term = terms[0]
+                words = matches & self._words.get(term, set())
+                if len(term) <= MAX_PREFIX:
+                    prefixes = (matches & self._prefixes.get(term, set())) - words
+                else:
+                    prefixes = {i for i in matches - words if self._score(term)(i) == 1}
+                best = []
+                for bucket in (words, prefixes, matches - words - prefixes):
+                    best.extend(heapq.nsmallest(limit - len(best), bucket, key=order.__getitem__))
+                    if len(best) >= limit:
+                        break
+            
+            return [
+                (student_id, f'{self._names[student_id][0]} {self._names[student_id][1]}')
+                for student_id in best
+            ]
+
+student_index = StudentNameIndex()
@@ -0,0 +1,48 @@
+from sqlalchemy.engine import make_url
+
+# Pooled connections per gevent worker when the engine profile sets none.
+# Requests hold a connection only while they query, so a few dozen cover
+# hundreds of open kiosk streams; the rest wait their turn.
+COOPERATIVE_POOL_SIZE = 10
+COOPERATIVE_MAX_OVERFLOW = 20
+
+def cooperative():
+    """True when running under gevent with the standard library monkey-patched"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+def prepare_cooperative(app):
+    """Make the app safe to serve from gevent greenlets.
+
+    Call after the engine profile is applied and before db.init_app.
+
+    Flask-SQLAlchemy scopes sessions to the app context, which lives in a
+    context variable, so every greenlet gets its own session as long as
+    greenlet supports context variables. psycopg2 talks to PostgreSQL in C
+    and would block every greenlet in the worker, so it is switched to
+    gevent's wait callback when psycogreen is installed. SQLite calls block
+    too, but WAL keeps them short. Connection pool waits use the patched
+    threading primitives and simply yield.
+    """
+    import greenlet
+    if not getattr(greenlet, 'GREENLET_USE_CONTEXT_VARS', False):
+        raise RuntimeError('gevent serving needs a greenlet release with context variable support')
+
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'postgresql':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            app.logger.warning('psycogreen is not installed; PostgreSQL queries will block the gevent worker')
+        else:
+            patch_psycopg()
+
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite keeps one connection per thread; nothing to size
+        return
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', COOPERATIVE_POOL_SIZE)
+    options.setdefault('max_overflow', COOPERATIVE_MAX_OVERFLOW)
@@ -0,0 +1,16 @@
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+def dialect_insert(table):
+    """Return a dialect-specific INSERT that supports ON CONFLICT"""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+def epoch_days(column):
+    """SQL expression: a DATE column as whole days since 1970-01-01"""
+    if db.engine.dialect.name == 'postgresql':
+        return cast(func.extract('epoch', column) / 86400, Integer)
+    # 2440587.5 is the Julian day of 1970-01-01
+    return cast(func.julianday(column) - 2440587.5, Integer)
@@ -0,0 +1,186 @@
+from datetime import date, datetime
+from itertools import groupby
+from sqlalchemy import case, func, or_, select, tuple_
+from app import db
+from app.archive import all_checkins
+from app.models import Student, StudentStats
+from app.roster import InvalidCursor, decode_values, encode_values
+from app.sql import dialect_insert
+
+def week_index(day):
+    """Number of the Monday-to-Sunday week containing day; consecutive weeks differ by 1"""
+    return (day.toordinal() - 1) // 7
+
+def note_checkins(day, times):
+    """Fold new check-ins on day into the students' stats, in the current transaction.
+
+    times maps student_id to time_in. Each student's row is upserted in one
+    statement: the total goes up by one, last_checkin_at moves forward, and
+    the streak grows if the previous week was the last one counted, stays
+    if this week was already counted, and restarts after a gap.
+    """
+    if not times:
+        return
+    week = week_index(day)
+    table = StudentStats.__table__
+    stmt = dialect_insert(table)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['student_id'],
+        set_={
+            'total': table.c.total + 1,
+            'last_checkin_at': case(
+                (or_(table.c.last_checkin_at.is_(None), new.last_checkin_at > table.c.last_checkin_at),
+                 new.last_checkin_at),
+                else_=table.c.last_checkin_at
+            ),
+            'streak_weeks': case(
+                (table.c.streak_week.is_(None), 1),
+                (table.c.streak_week == new.streak_week, table.c.streak_weeks),
+                (table.c.streak_week == new.streak_week - 1, table.c.streak_weeks + 1),
+                (table.c.streak_week < new.streak_week, 1),
+                else_=table.c.streak_weeks
+            ),
+            'streak_week': case(
+                (or_(table.c.streak_week.is_(None), table.c.streak_week < new.streak_week), new.streak_week),
+                else_=table.c.streak_week
+            )
+        }
+    )
+    db.session.execute(stmt, [
+        {
+            'student_id': student_id,
+            'total': 1,
+            'last_checkin_at': time_in,
+            'streak_weeks': 1,
+            'streak_week': week
+        }
+        for student_id, time_in in times.items()
+    ])
+
+def _compute(student_ids=None):
+    """Yield stats row dicts recomputed from attendance and its archive"""
+    checkins = all_checkins('student_id', 'date', 'time_in')
+    totals = select(
+        checkins.c.student_id, func.count(), func.max(checkins.c.time_in)
+    ).group_by(checkins.c.student_id)
+    days = select(checkins.c.student_id, checkins.c.date).distinct().order_by(checkins.c.student_id)
+    if student_ids is not None:
+        totals = totals.where(checkins.c.student_id.in_(student_ids))
+        days = days.where(checkins.c.student_id.in_(student_ids))
+
+    figures = {student_id: (total, last) for student_id, total, last in db.session.execute(totals)}
+    for student_id, rows in groupby(db.session.execute(days), key=lambda row: row[0]):
+        # Count consecutive weeks back from the latest one
+        weeks = sorted({week_index(day) for _, day in rows}, reverse=True)
+        streak = 1
+        while streak < len(weeks) and weeks[streak] == weeks[0] - streak:
+            streak += 1
+        total, last = figures[student_id]
+        yield {
+            'student_id': student_id,
+            'total': total,
+            'last_checkin_at': last,
+            'streak_weeks': streak,
+            'streak_week': weeks[0]
+        }
+
+def refresh_stats(student_ids):
+    """Recompute the stats of a few students, e.g. after a check-in was removed"""
+    student_ids = list(student_ids)
+    table = StudentStats.__table__
+    db.session.execute(table.delete().where(table.c.student_id.in_(student_ids)))
+    rows = list(_compute(student_ids))
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+def rebuild_stats():
+    """Recompute every student's stats from scratch. Returns the row count."""
+    table = StudentStats.__table__
+    db.session.execute(table.delete())
+    count = 0
+    batch = []
+    for row in _compute():
+        batch.append(row)
+        if len(batch) >= 1000:
+            db.session.execute(table.insert(), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        count += len(batch)
+    db.session.commit()
+    return count
+
+def current_streak(today=None):
+    """SQL expression: the streak if it includes this week or last, else 0"""
+    week = week_index(today or date.today())
+    return case(
+        (StudentStats.streak_week >= week - 1, StudentStats.streak_weeks),
+        else_=0
+    )
+
+def streak_now(stats, today=None):
+    """Python counterpart of current_streak() for one stats row (or None)"""
+    if stats is None or stats.streak_week is None:
+        return 0
+    week = week_index(today or date.today())
+    return stats.streak_weeks if stats.streak_week >= week - 1 else 0
+
+# Sort orders for the students page: (key expression, cursor value parser,
+# cursor value of a row). Name sorts A-Z; the others put the most engaged
+# students first, ties broken by newest id.
+EPOCH = datetime(1900, 1, 1)
+STUDENT_SORTS = {
+    'name': (
+        lambda: Student.last_name, str,
+        lambda student, stats: student.last_name
+    ),
+    'total': (
+        lambda: func.coalesce(StudentStats.total, 0), int,
+        lambda student, stats: stats.total if stats else 0
+    ),
+    'last_seen': (
+        lambda: func.coalesce(StudentStats.last_checkin_at, EPOCH), datetime.fromisoformat,
+        lambda student, stats: (stats and stats.last_checkin_at or EPOCH).isoformat()
+    ),
+    'streak': (
+        current_streak, int,
+        lambda student, stats: streak_now(stats)
+    ),
+}
+
+def student_stats_page(sort='name', after=None, limit=100):
+    """Return ([(student, stats or None)], next_cursor) for one page of the students list.
+
+    sort is a key of STUDENT_SORTS. Each page is one query joining the
+    stats table and, like the roster, is keyset-paginated on (sort key, id).
+    """
+    key, parse, value_of = STUDENT_SORTS[sort]
+    key = key()
+    ascending = sort == 'name'
+    
+    query = db.session.query(Student, StudentStats).outerjoin(
+        StudentStats, StudentStats.student_id == Student.id
+    )
+    if ascending:
+        query = query.order_by(key, Student.id)
+    else:
+        query = query.order_by(key.desc(), Student.id.desc())
+    
+    if after:
+        value, student_id = decode_values(after)
+        try:
+            position = (parse(value), int(student_id))
+        except (TypeError, ValueError):
+            raise InvalidCursor(after)
+        if ascending:
+            query = query.filter(tuple_(key, Student.id) > position)
+        else:
+            query = query.filter(tuple_(key, Student.id) < position)
+    
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_values([value_of(*rows[-1]), rows[-1][0].id])
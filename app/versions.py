@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from flask import g, has_app_context
+from sqlalchemy import event
+from app import db
+from app.models import DataVersion, DanceClass, Student, StudentChange
+from app.sql import dialect_insert
+
+# Table-wide version keys. 'students' and 'classes' move on any change to
+# those tables; 'attendance' moves on every check-in write, alongside the
+# per class/day key.
+STUDENTS_KEY = 'students'
+CLASSES_KEY = 'classes'
+ATTENDANCE_KEY = 'attendance'
+
+# How long the per-version student change log is kept
+STUDENT_CHANGE_RETENTION = timedelta(days=30)
+
+def attendance_key(class_id, day):
+    """Version key for the check-ins of one class on one day"""
+    return f'attendance:{class_id}:{day.isoformat()}'
+
+def current_version(key):
+    """Return the current version for key (0 if it was never bumped)."""
+    version = db.session.query(DataVersion.version).filter(DataVersion.key == key).scalar()
+    return version or 0
+
+def current_versions(keys):
+    """Return {key: version} for several keys in one query (0 if never bumped)."""
+    found = dict(db.session.query(DataVersion.key, DataVersion.version).filter(DataVersion.key.in_(keys)))
+    return {key: found.get(key, 0) for key in keys}
+
+def request_version(key):
+    """current_version(key), reusing the read conditional_get made for this request.
+
+    A page answered through conditional_get is then built from exactly the
+    versions its ETag names, without reading them a second time.
+    """
+    versions = g.get('data_versions', {}) if has_app_context() else {}
+    if key in versions:
+        return versions[key]
+    return current_version(key)
+
+def bump_version(key):
+    """Increment the version for key within the current transaction and return it."""
+    table = DataVersion.__table__
+    stmt = dialect_insert(table).values(key=key, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'version': table.c.version + 1}
+    ).returning(table.c.version)
+    return db.session.execute(stmt).scalar_one()
+
+def log_student_changes(student_ids):
+    """Bump the 'students' version and record which students it covers.
+
+    Call within the transaction that changes them. Returns the new version.
+    """
+    version = bump_version(STUDENTS_KEY)
+    now = datetime.utcnow()
+    db.session.execute(StudentChange.__table__.insert(), [
+        {'version': version, 'student_id': student_id, 'changed_at': now}
+        for student_id in student_ids
+    ])
+    table = StudentChange.__table__
+    db.session.execute(table.delete().where(table.c.changed_at < now - STUDENT_CHANGE_RETENTION))
+    return version
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_table_versions(session, flush_context):
+    """Bump 'students' / 'classes' whenever the ORM writes those tables"""
+    students = {
+        obj.id for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, Student) and (obj not in session.dirty or session.is_modified(obj))
+    }
+    if students:
+        log_student_changes(sorted(students))
+    if any(isinstance(obj, DanceClass) for obj in (*session.new, *session.dirty, *session.deleted)):
+        bump_version(CLASSES_KEY)
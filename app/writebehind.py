@@ -0,0 +1,250 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from app import db
+from app.cache import checked_in_cache
+from app.checkin import replay_checkins
+from app.models import Attendance
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+JOURNAL_PREFIX = 'checkins-'
+JOURNAL_SUFFIX = '.jsonl'
+# Seconds to wait before retrying a failed group commit
+RETRY_DELAY = 1.0
+
+class CheckinWriter:
+    """Write-behind queue that commits check-ins in groups.
+
+    submit() journals a check-in, adds it to an in-process buffer and
+    returns at once; a background thread commits whatever is buffered every
+    CHECKIN_FLUSH_INTERVAL seconds as one transaction. A burst of taps then
+    costs one database lock and one fsync per interval instead of one per tap.
+
+    Buffered taps go through replay_checkins, so they get the same
+    de-duplication and derived-data updates as any other check-in, and the
+    journal can be replayed after a crash without double counting: each tap
+    carries a client id whose receipt is committed with it. Each worker
+    holds an exclusive lock on its own journal; recover_journals() replays
+    journals nobody holds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['CHECKIN_FLUSH_INTERVAL']
+        self.fsync = app.config['CHECKIN_JOURNAL_FSYNC']
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer = []       # (client_id, student_id, class_id, tapped_at) not yet committed
+        self._pending = {}      # (student_id, class_id, day) -> tapped_at, until committed
+        self._stopping = threading.Event()
+
+        directory = app.config['CHECKIN_JOURNAL_DIR']
+        os.makedirs(directory, exist_ok=True)
+        self.journal_path = os.path.join(directory, f'{JOURNAL_PREFIX}{uuid.uuid4().hex}{JOURNAL_SUFFIX}')
+        self._journal = open(self.journal_path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._journal, fcntl.LOCK_EX)
+
+        self._thread = threading.Thread(target=self._run, name='checkin-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, student_id, class_id, tapped_at):
+        """Queue a check-in and return (time_in, created) like record_checkin.
+
+        created is False if the student is already checked in, committed or
+        still queued. The tap is in the journal before this returns. Needs
+        an app context; the caller has already validated the ids.
+        """
+        day = tapped_at.date()
+        key = (student_id, class_id, day)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key], False
+
+        if student_id in checked_in_cache.get(class_id, day):
+            time_in = db.session.query(Attendance.time_in).filter_by(
+                student_id=student_id, class_id=class_id, date=day
+            ).scalar()
+            if time_in is not None:
+                return time_in, False
+
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key], False
+            client_id = uuid.uuid4().hex
+            self._write_journal({
+                'client_id': client_id,
+                'student_id': student_id,
+                'class_id': class_id,
+                'tapped_at': tapped_at.isoformat()
+            })
+            self._buffer.append((client_id, student_id, class_id, tapped_at))
+            self._pending[key] = tapped_at
+        return tapped_at, True
+
+    def cancel(self, student_id, class_id, day):
+        """Drop a queued check-in before it is committed. Returns True if there was one.
+
+        Waits for a group commit in progress, so a check-in it was writing
+        is in the database (for remove_checkin to delete) by the time this
+        returns. The cancellation is journaled, so journal recovery after a
+        crash does not bring the check-in back.
+        """
+        key = (student_id, class_id, day)
+        with self._flush_lock:
+            with self._lock:
+                if self._pending.pop(key, None) is None:
+                    return False
+                dropped = [tap for tap in self._buffer if (tap[1], tap[2], tap[3].date()) == key]
+                self._buffer = [tap for tap in self._buffer if tap not in dropped]
+                if not self._buffer:
+                    # Nothing journaled is left to commit
+                    self._journal.truncate(0)
+                else:
+                    for tap in dropped:
+                        self._write_journal({'cancel': tap[0]})
+        return True
+
+    def _write_journal(self, entry):
+        # Called with self._lock held
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def queued(self):
+        """Number of check-ins acknowledged but not yet committed"""
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Commit everything buffered so far in one transaction.
+
+        Returns the number of check-ins committed, or None if the commit
+        failed; failed check-ins stay buffered and journaled for the next try.
+        """
+        with self._flush_lock:
+            with self._lock:
+                taps, self._buffer = self._buffer, []
+            if not taps:
+                return 0
+            try:
+                with self.app.app_context():
+                    statuses = replay_checkins(taps, datetime.now())
+                    db.session.commit()
+            except Exception:
+                self.app.logger.exception('Could not commit %d queued check-ins; will retry', len(taps))
+                with self._lock:
+                    self._buffer[:0] = taps
+                return None
+
+            invalid = [tap for tap in taps if statuses.get(tap[0]) == 'invalid']
+            if invalid:
+                self.app.logger.warning('Dropped %d queued check-ins for unknown students or classes', len(invalid))
+            rejected = [tap for tap in taps if statuses.get(tap[0]) == 'rejected']
+            if rejected:
+                self.app.logger.warning('Dropped %d queued check-ins too old to replay', len(rejected))
+            with self._lock:
+                for client_id, student_id, class_id, tapped_at in taps:
+                    self._pending.pop((student_id, class_id, tapped_at.date()), None)
+                if not self._buffer:
+                    # Everything journaled so far is committed
+                    self._journal.truncate(0)
+            return len(taps)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            if self.flush() is None:
+                self._stopping.wait(RETRY_DELAY)
+
+    def stop(self):
+        """Commit what is still buffered and close the journal."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join()
+        self.flush()
+        with self._lock:
+            drained = not self._buffer
+            self._journal.close()
+        if drained:
+            os.remove(self.journal_path)
+
+_writer_lock = threading.Lock()
+
+def get_checkin_writer(app):
+    """Return the app's CheckinWriter if CHECKIN_WRITE_BEHIND is on, else None"""
+    if not app.config['CHECKIN_WRITE_BEHIND']:
+        return None
+    writer = app.extensions.get('checkin_writer')
+    if writer is None:
+        with _writer_lock:
+            writer = app.extensions.get('checkin_writer')
+            if writer is None:
+                writer = app.extensions['checkin_writer'] = CheckinWriter(app)
+    return writer
+
+def _read_journal(journal):
+    """Return the taps in a journal that were not cancelled, skipping a line torn by a crash"""
+    taps, cancelled = [], set()
+    for line in journal:
+        try:
+            entry = json.loads(line)
+            if 'cancel' in entry:
+                cancelled.add(entry['cancel'])
+                continue
+            taps.append((
+                entry['client_id'],
+                int(entry['student_id']),
+                int(entry['class_id']),
+                datetime.fromisoformat(entry['tapped_at'])
+            ))
+        except (ValueError, KeyError, TypeError):
+            continue
+    return [tap for tap in taps if tap[0] not in cancelled]
+
+def recover_journals(app):
+    """Commit check-ins left in the journals of workers that exited uncleanly.
+
+    Journals still locked by a live worker are skipped. Returns the number
+    of journaled taps replayed (already committed ones are de-duplicated).
+    """
+    directory = app.config['CHECKIN_JOURNAL_DIR']
+    if fcntl is None or not os.path.isdir(directory):
+        return 0
+    replayed = 0
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith(JOURNAL_PREFIX) and name.endswith(JOURNAL_SUFFIX)):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            journal = open(path)
+        except FileNotFoundError:
+            continue
+        with journal:
+            try:
+                fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue
+            taps = _read_journal(journal)
+            if not taps and time.time() - os.path.getmtime(path) < 60:
+                # Possibly a worker's new journal, created but not yet locked
+                continue
+            if taps:
+                statuses = replay_checkins(taps, datetime.now())
+                db.session.commit()
+                rejected = sum(status == 'rejected' for status in statuses.values())
+                if rejected:
+                    app.logger.warning('Dropped %d journaled check-ins from %s too old to replay', rejected, name)
+            os.remove(path)
+            replayed += len(taps)
+    return replayed
@@ -0,0 +1,8 @@
+"""Performance benchmarks for Easy CheckIn.
+
+Each module is a standalone script, e.g. ``python -m benchmarks.batch_checkin``.
+They run against a throwaway SQLite database unless BENCH_DATABASE_URL is set.
+
+``python -m benchmarks.suite`` runs the hot endpoints end to end against a
+seeded database and compares them with the stored ``baseline.json``.
+"""
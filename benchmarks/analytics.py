@@ -0,0 +1,81 @@
+"""Time the dashboard analytics over a large check-in history.
+
+Seeds --rows check-ins (--students students, --classes classes, spread over
+--years) into a throwaway database, then times loading the columns,
+computing the analytics, and a cold and a warm /dashboard request.
+
+    python -m benchmarks.analytics [--rows 1000000] [--students 20000]
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+import numpy as np
+
+from benchmarks.common import make_app, seed_roster, timed
+
+def seed_checkins(student_ids, class_ids, n_rows, years, class_size=25, seed=0):
+    """Insert about n_rows check-ins as class sessions of class_size distinct students."""
+    from app import db
+    from app.models import Attendance
+    from app.rollup import rebuild_rollups
+
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    n_sessions = n_rows // class_size
+    # Distinct (class, day) sessions
+    slots = rng.choice(len(class_ids) * years * 365, size=n_sessions, replace=False)
+    students = np.array(student_ids)
+    rows = []
+    for slot in slots:
+        class_id = class_ids[slot % len(class_ids)]
+        day = today - timedelta(days=int(slot // len(class_ids)) + 1)
+        time_in = datetime.combine(day, dtime(18))
+        for student_id in rng.choice(students, size=class_size, replace=False):
+            rows.append({'student_id': int(student_id), 'class_id': class_id, 'date': day, 'time_in': time_in})
+        if len(rows) >= 50000:
+            db.session.execute(Attendance.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Attendance.__table__.insert(), rows)
+    db.session.commit()
+    rebuild_rollups()
+    return n_sessions * class_size
+
+def run(n_rows, n_students, n_classes, years):
+    from app.analytics import analytics_cache, compute, load_columns
+
+    # Bulk seeding inserts are slow by design; don't log each one
+    os.environ.setdefault('SLOW_QUERY_THRESHOLD', '0')
+    app = make_app()
+    with app.app_context():
+        student_ids, class_ids = seed_roster(n_students, n_classes)
+        seeded = seed_checkins(student_ids, class_ids, n_rows, years)
+        print(f"{seeded} check-ins, {n_students} students, {n_classes} classes over {years} years")
+
+        load_time, columns = timed(load_columns)
+        compute_time, _ = timed(compute, *columns, date.today())
+        print(f"  load columns: {load_time * 1000:8.1f} ms")
+        print(f"  compute:      {compute_time * 1000:8.1f} ms")
+
+    client = app.test_client()
+    analytics_cache.clear()
+    for label in ('cold', 'warm'):
+        start = time.perf_counter()
+        response = client.get('/dashboard')
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.status_code
+        print(f"  dashboard ({label}): {elapsed * 1000:6.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--classes', type=int, default=40)
+    parser.add_argument('--years', type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.students, args.classes, args.years)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Benchmark mark_attendance_batch: queries and latency per batch size.
+
+The query count should stay constant as the batch grows.
+
+    python -m benchmarks.batch_checkin [--sizes 10 60 240]
+"""
+import argparse
+
+from benchmarks.common import QueryCounter, make_app, seed_roster, timed
+
+def run(sizes):
+    app = make_app()
+    client = app.test_client()
+    
+    from app import db
+    with app.app_context():
+        student_ids, class_ids = seed_roster(sum(sizes), n_classes=len(sizes))
+        engine = db.engine
+    
+    print(f"{'batch':>6} {'queries':>8} {'ms':>9} {'checked in':>11}")
+    offset = 0
+    for size, class_id in zip(sizes, class_ids):
+        batch = student_ids[offset:offset + size]
+        offset += size
+        with QueryCounter(engine) as counter:
+            elapsed, response = timed(client.post, '/mark_attendance_batch', json={
+                'student_ids': batch,
+                'class_id': class_id
+            })
+        checked_in = len(response.get_json()['students'])
+        print(f"{size:>6} {counter.count:>8} {elapsed * 1000:>9.2f} {checked_in:>11}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 60, 240])
+    args = parser.parse_args()
+    run(args.sizes)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Exercise /api/chat with the offline stub backend.
+
+Fires a burst of concurrent chat requests at a slow stub upstream and
+reports how many were answered, refused as busy, or timed out, and how
+repeated questions are served from the cache.
+
+    python -m benchmarks.chat [--requests 20] [--delay 0.5]
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_app, summarize
+
+def run(n_requests, delay, timeout):
+    os.environ.update({
+        'CHAT_BACKEND': 'stub',
+        'CHAT_STUB_DELAY': str(delay),
+        'CHAT_TIMEOUT': str(timeout)
+    })
+    app = make_app()
+    
+    def ask(i):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/chat', json={'message': f'Question {i}'})
+        return response.status_code, time.perf_counter() - start
+    
+    with ThreadPoolExecutor(max_workers=n_requests) as pool:
+        results = list(pool.map(ask, range(n_requests)))
+    statuses = Counter(status for status, _ in results)
+    print(f"burst of {n_requests} distinct questions (stub delay {delay}s, "
+          f"cap {app.config['CHAT_MAX_CONCURRENCY']}, timeout {timeout}s)")
+    print(f"  answered: {statuses[200]}  busy/timed out (503): {statuses[503]}  "
+          f"max wait: {max(elapsed for _, elapsed in results) * 1000:.0f} ms")
+    
+    # Let the burst drain, then repeat one question
+    time.sleep(delay * 2)
+    client = app.test_client()
+    samples = []
+    for _ in range(20):
+        start = time.perf_counter()
+        client.post('/api/chat', json={'message': 'Question 0'})
+        samples.append(time.perf_counter() - start)
+    print(f"  repeated question p50: {summarize(samples)['p50']:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--delay', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=2.0)
+    args = parser.parse_args()
+    run(args.requests, args.delay, args.timeout)
+
+if __name__ == '__main__':
+    main()
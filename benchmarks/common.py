@@ -0,0 +1,156 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta, time as dtime
+
+from sqlalchemy import event
+
+def make_app(database_url=None):
+    """Create the app against a throwaway database (or the given URL)."""
+    if database_url is None:
+        database_url = os.environ.get('BENCH_DATABASE_URL')
+    if database_url is None:
+        tmp_dir = tempfile.mkdtemp(prefix='checkin-bench-')
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    
+    from app import create_app
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    
+    @app.context_processor
+    def inject_now():
+        return {'now': datetime.utcnow()}
+    
+    return app
+
+FIRST_NAMES = [
+    'Aaliyah', 'Amara', 'Andre', 'Beatriz', 'Caleb', 'Chen', 'Dana', 'Diego',
+    'Elena', 'Emeka', 'Fatima', 'Gabriel', 'Hana', 'Isaac', 'Jamal', 'Julia',
+    'Kenji', 'Laila', 'Lucas', 'Maya', 'Mateo', 'Nadia', 'Noah', 'Olivia',
+    'Priya', 'Quinn', 'Rafael', 'Sara', 'Sofia', 'Tariq', 'Uma', 'Victor',
+    'Wei', 'Ximena', 'Yusuf', 'Zoe'
+]
+LAST_NAMES = [
+    'Abara', 'Bauer', 'Castillo', 'Dubois', 'Eriksen', 'Fernandes', 'Garcia',
+    'Haddad', 'Ivanova', 'Johnson', 'Kowalski', 'Lindqvist', 'Mensah',
+    'Nakamura', 'Okafor', 'Petrov', 'Quintero', 'Rossi', 'Schmidt', 'Tanaka',
+    'Umarov', 'Vasquez', 'Williams', 'Xu', 'Yilmaz', 'Zhang', "O'Brien",
+    'Smith-Jones', 'Nguyen', 'Patel', 'Kim', 'Silva'
+]
+
+def student_name(i):
+    """Deterministic, varied (first, last) name for the i-th synthetic student."""
+    return (
+        FIRST_NAMES[i % len(FIRST_NAMES)],
+        f'{LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}'
+        + ('' if i < len(FIRST_NAMES) * len(LAST_NAMES) else f' {i // (len(FIRST_NAMES) * len(LAST_NAMES))}')
+    )
+
+def seed_roster(n_students, n_classes=1, day_of_week=None):
+    """Insert n_students students and n_classes classes; return their ids."""
+    from app import db
+    from app.models import Student, DanceClass
+    
+    names = [student_name(i) for i in range(n_students)]
+    db.session.execute(Student.__table__.insert(), [
+        {
+            'first_name': names[i][0],
+            'last_name': names[i][1],
+            'email': f'student{i}@example.com',
+            'created_at': datetime.utcnow()
+        }
+        for i in range(n_students)
+    ])
+    db.session.execute(DanceClass.__table__.insert(), [
+        {
+            'name': f'Class {i}',
+            'instructor_name': 'Bench',
+            'day_of_week': day_of_week or datetime.now().strftime('%A'),
+            'start_time': dtime(0, 0),
+            'end_time': dtime(23, 59)
+        }
+        for i in range(n_classes)
+    ])
+    db.session.commit()
+    student_ids = [row[0] for row in db.session.query(Student.id).order_by(Student.id)]
+    class_ids = [row[0] for row in db.session.query(DanceClass.id).order_by(DanceClass.id)]
+    return student_ids, class_ids
+
+def seed_history(student_ids, class_ids, years=1, class_size=25, seed=0):
+    """Insert weekly attendance for every class going back years; return the row count.
+    
+    Each class meets once a week on today's weekday (the seeded classes all
+    do) with a random class_size students. Rollups are rebuilt afterwards,
+    as they would be after an import.
+    """
+    from app import db
+    from app.models import Attendance
+    from app.rollup import rebuild_rollups
+    
+    rng = random.Random(seed)
+    today = date.today()
+    class_size = min(class_size, len(student_ids))
+    rows = []
+    total = 0
+    for week in range(1, years * 52 + 1):
+        day = today - timedelta(weeks=week)
+        for class_id in class_ids:
+            for student_id in rng.sample(student_ids, class_size):
+                rows.append({
+                    'student_id': student_id,
+                    'class_id': class_id,
+                    'date': day,
+                    'time_in': datetime.combine(day, dtime(18, rng.randrange(60)))
+                })
+        if len(rows) >= 10000:
+            db.session.execute(Attendance.__table__.insert(), rows)
+            total += len(rows)
+            rows = []
+    if rows:
+        db.session.execute(Attendance.__table__.insert(), rows)
+        total += len(rows)
+    db.session.commit()
+    rebuild_rollups()
+    return total
+
+class QueryCounter:
+    """Count SQL statements issued on an engine while the block runs."""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+    
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(samples):
+    """Return p50/p95/p99/mean in milliseconds for samples given in seconds."""
+    ms = [s * 1000 for s in samples]
+    return {
+        'p50': percentile(ms, 50),
+        'p95': percentile(ms, 95),
+        'p99': percentile(ms, 99),
+        'mean': statistics.fmean(ms)
+    }
+
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (elapsed_seconds, result)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
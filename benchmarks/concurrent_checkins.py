@@ -0,0 +1,98 @@
+"""Run many parallel check-ins against each database engine profile.
+
+Each worker process stands in for a gunicorn worker: it builds its own app
+and engine, then posts check-ins for its own students as fast as it can.
+Set BENCH_POSTGRES_URL to include the postgresql profile.
+
+    python -m benchmarks.concurrent_checkins [--workers 8] [--checkins 50]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.common import make_app, seed_roster, summarize
+
+def _worker(database_url, profile, student_ids, class_id, start_event, results):
+    os.environ['DATABASE_PROFILE'] = profile
+    app = make_app(database_url)
+    client = app.test_client()
+    latencies, failures = [], 0
+    start_event.wait()
+    for student_id in student_ids:
+        start = time.perf_counter()
+        try:
+            response = client.post('/mark_attendance', data={
+                'student_id': student_id,
+                'class_id': class_id
+            })
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        failures += not ok
+    results.put((latencies, failures))
+
+def run_profile(profile, database_url, workers, checkins):
+    os.environ['DATABASE_PROFILE'] = profile
+    app = make_app(database_url)
+    with app.app_context():
+        student_ids, class_ids = seed_roster(workers * checkins)
+    
+    ctx = multiprocessing.get_context('spawn')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_worker, args=(
+            database_url, profile,
+            student_ids[i * checkins:(i + 1) * checkins], class_ids[0],
+            start_event, results
+        ))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    # Give every worker time to build its app before the burst starts
+    time.sleep(3)
+    started = time.perf_counter()
+    start_event.set()
+    
+    latencies, failures = [], 0
+    for _ in processes:
+        worker_latencies, worker_failures = results.get()
+        latencies += worker_latencies
+        failures += worker_failures
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+    
+    stats = summarize(latencies)
+    print(f"{profile:<16} {len(latencies) / elapsed:>9.1f} {failures:>9} "
+          f"{stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--checkins', type=int, default=50, help='check-ins per worker')
+    parser.add_argument('--profiles', nargs='+', default=['sqlite-default', 'sqlite-wal'])
+    args = parser.parse_args()
+    
+    profiles = list(args.profiles)
+    postgres_url = os.environ.get('BENCH_POSTGRES_URL')
+    if postgres_url and 'postgresql' not in profiles:
+        profiles.append('postgresql')
+    
+    print(f"{args.workers} workers x {args.checkins} check-ins")
+    print(f"{'profile':<16} {'checkin/s':>9} {'failures':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for profile in profiles:
+        if profile == 'postgresql':
+            # Expects an empty database; tables are created on first use
+            database_url = postgres_url
+        else:
+            tmp_dir = tempfile.mkdtemp(prefix=f'checkin-bench-{profile}-')
+            database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+        run_profile(profile, database_url, args.workers, args.checkins)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Compare a burst of check-ins with and without the write-behind queue.
+
+Each worker process stands in for a gunicorn worker and runs --threads
+concurrent clients posting /mark_attendance for their own students, once
+with every tap committed on its own and once with CHECKIN_WRITE_BEHIND=1.
+Reports acknowledged check-ins per second and latency, then the rate once
+every queued check-in is committed, and checks that none went missing.
+
+    python -m benchmarks.group_commit [--workers 4] [--threads 8] [--checkins 50]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.common import make_app, seed_roster, summarize
+
+def _worker(database_url, write_behind, student_ids, class_id, threads, start_event, results):
+    os.environ['CHECKIN_WRITE_BEHIND'] = '1' if write_behind else '0'
+    app = make_app(database_url)
+    from app.writebehind import get_checkin_writer
+    # Start the writer (and its journal) before the clock does
+    writer = get_checkin_writer(app)
+
+    latencies, failures = [], [0]
+    lock = threading.Lock()
+
+    def client(ids):
+        http = app.test_client()
+        for student_id in ids:
+            start = time.perf_counter()
+            try:
+                response = http.post('/mark_attendance', data={'student_id': student_id, 'class_id': class_id})
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                failures[0] += not ok
+
+    pool = [threading.Thread(target=client, args=(student_ids[i::threads],)) for i in range(threads)]
+    start_event.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    acknowledged = time.perf_counter() - started
+    if writer is not None:
+        writer.stop()
+    committed = time.perf_counter() - started
+    results.put((latencies, failures[0], acknowledged, committed))
+
+def run_mode(write_behind, workers, threads, checkins):
+    tmp_dir = tempfile.mkdtemp(prefix='checkin-bench-group-')
+    database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ['CHECKIN_JOURNAL_DIR'] = os.path.join(tmp_dir, 'journal')
+    app = make_app(database_url)
+    per_worker = threads * checkins
+    with app.app_context():
+        student_ids, class_ids = seed_roster(workers * per_worker)
+
+    ctx = multiprocessing.get_context('spawn')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_worker, args=(
+            database_url, write_behind,
+            student_ids[i * per_worker:(i + 1) * per_worker], class_ids[0],
+            threads, start_event, results
+        ))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    # Give every worker time to build its app before the burst starts
+    time.sleep(3)
+    start_event.set()
+
+    latencies, failures, acknowledged, committed = [], 0, 0, 0
+    for _ in processes:
+        worker_latencies, worker_failures, worker_acknowledged, worker_committed = results.get()
+        latencies += worker_latencies
+        failures += worker_failures
+        acknowledged = max(acknowledged, worker_acknowledged)
+        committed = max(committed, worker_committed)
+    for process in processes:
+        process.join()
+
+    from app import db
+    from app.models import Attendance
+    with app.app_context():
+        stored = db.session.query(Attendance).count()
+
+    stats = summarize(latencies)
+    mode = 'write-behind' if write_behind else 'direct'
+    print(f"{mode:<13} {len(latencies) / acknowledged:>9.1f} {len(latencies) / committed:>11.1f} "
+          f"{stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f} {failures:>9} "
+          f"{stored:>7}/{len(latencies)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients per worker')
+    parser.add_argument('--checkins', type=int, default=50, help='check-ins per client')
+    parser.add_argument('--profile', default='sqlite-wal')
+    args = parser.parse_args()
+    os.environ['DATABASE_PROFILE'] = args.profile
+
+    print(f"{args.workers} workers x {args.threads} clients x {args.checkins} check-ins ({args.profile})")
+    print(f"{'mode':<13} {'acked/s':>9} {'committed/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'failures':>9} {'stored':>11}")
+    for write_behind in (False, True):
+        run_mode(write_behind, args.workers, args.threads, args.checkins)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Load test: kiosk throughput while hundreds of live connections stay open.
+
+Starts gunicorn (gunicorn.conf.py) against a seeded throwaway database
+once per worker class. It opens --streams kiosk event streams and leaves
+them idle, then runs --clients concurrent clients hammering
+/search_students for --seconds. Sync workers are tied up by the first
+streams and the searches starve; gevent workers keep answering.
+
+    python -m benchmarks.load [--worker-class sync gevent] [--streams 300]
+"""
+import argparse
+import http.client
+import os
+import select
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import make_app, seed_roster, student_name, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(worker_class, workers, database_url, port):
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        # Serve the streams under both worker classes, and keep them open
+        # for the whole run
+        KIOSK_EVENTS='1',
+        KIOSK_EVENTS_TIMEOUT='600',
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'run:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/students?limit=1')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'gunicorn ({worker_class}) did not start')
+
+def open_streams(port, class_id, count):
+    """Open count idle event-stream connections and return their sockets"""
+    streams = []
+    for _ in range(count):
+        s = socket.create_connection(('127.0.0.1', port))
+        s.sendall(f'GET /kiosk/{class_id}/events HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        streams.append(s)
+    return streams
+
+def answered(streams):
+    """How many streams have received their response headers"""
+    readable, _, _ = select.select(streams, [], [], 1.0)
+    return len(readable)
+
+def hammer(port, class_id, clients, seconds):
+    """Run clients threads searching for seconds; return (latencies, errors)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client(n):
+        i = n
+        while time.monotonic() < stop:
+            query = student_name(i)[0][:3]
+            i += clients
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                conn.request('GET', f'/search_students?query={query}&class_id={class_id}')
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+def run(worker_classes, workers, streams, clients, seconds):
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='checkin-load-'), 'load.db')}"
+    app = make_app(database_url)
+    with app.app_context():
+        _, class_ids = seed_roster(500, n_classes=1)
+
+    print(f"{streams} idle kiosk streams, {clients} searching clients for {seconds}s, {workers} workers")
+    print(f"{'workers':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'streams up':>11}")
+    for worker_class in worker_classes:
+        port = free_port()
+        server = start_server(worker_class, workers, database_url, port)
+        sockets = []
+        try:
+            sockets = open_streams(port, class_ids[0], streams)
+            latencies, errors = hammer(port, class_ids[0], clients, seconds)
+            up = answered(sockets)
+        finally:
+            for s in sockets:
+                s.close()
+            server.terminate()
+            server.wait()
+        stats = summarize(latencies) if latencies else {'p50': float('nan'), 'p95': float('nan')}
+        print(f"{worker_class:>8} {len(latencies) / seconds:>8.1f} {stats['p50']:>8.1f} "
+              f"{stats['p95']:>8.1f} {errors:>7} {up:>11}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--worker-class', nargs='+', default=['sync', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--streams', type=int, default=300)
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    run(args.worker_class, args.workers, args.streams, args.clients, args.seconds)
+
+if __name__ == '__main__':
+    main()
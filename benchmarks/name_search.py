@@ -0,0 +1,49 @@
+"""Benchmark kiosk name search: in-memory index vs. ILIKE table scan.
+
+    python -m benchmarks.name_search [--students 5000]
+"""
+import argparse
+import time
+
+from benchmarks.common import make_app, seed_roster, summarize
+
+QUERIES = ['m', 'ma', 'mat', 'mateo', 'ssi', 'nakam', 'sofia o', 'maya smith', 'zzz']
+
+def run(n_students, repeat):
+    app = make_app()
+    
+    from app.models import Student
+    from app.search import student_index
+    with app.app_context():
+        seed_roster(n_students)
+        
+        start = time.perf_counter()
+        student_index.rebuild()
+        print(f"index build for {n_students} students: {(time.perf_counter() - start) * 1000:.1f} ms")
+        
+        print(f"{'query':<16} {'ilike p50 ms':>13} {'index p50 ms':>13} {'hits':>5}")
+        for query in QUERIES:
+            ilike, indexed = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                Student.query.filter(
+                    (Student.first_name.ilike(f'%{query}%') |
+                     Student.last_name.ilike(f'%{query}%'))
+                ).order_by(Student.last_name).limit(20).all()
+                ilike.append(time.perf_counter() - start)
+                
+                start = time.perf_counter()
+                hits = student_index.search(query, limit=20)
+                indexed.append(time.perf_counter() - start)
+            print(f"{query:<16} {summarize(ilike)['p50']:>13.3f} "
+                  f"{summarize(indexed)['p50']:>13.3f} {len(hits):>5}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    run(args.students, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Measure worker startup: import time, create_app time and first-request latency.
+
+Each run is a fresh interpreter, like a newly forked gunicorn worker. The
+first run starts against an empty database and template cache; later runs
+show the steady state where the schema check and template compilation are
+already done.
+
+    python -m benchmarks.startup [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+_PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app as package
+t1 = time.perf_counter()
+from benchmarks.common import make_app
+application = make_app(sys.argv[1])
+t2 = time.perf_counter()
+client = application.test_client()
+client.get('/')
+t3 = time.perf_counter()
+client.get('/dashboard')
+t4 = time.perf_counter()
+print(json.dumps({
+    'import': t1 - t0,
+    'create_app': t2 - t1,
+    'first_request': t3 - t2,
+    'second_page': t4 - t3,
+    'openai_loaded': 'openai' in sys.modules
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    
+    tmp_dir = tempfile.mkdtemp(prefix='checkin-startup-')
+    database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    env = dict(os.environ, JINJA_CACHE_DIR=os.path.join(tmp_dir, 'jinja_cache'))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    
+    print(f"{'run':>4} {'import ms':>10} {'create_app ms':>14} {'first req ms':>13} "
+          f"{'2nd page ms':>12} {'openai loaded':>14}")
+    for run in range(1, args.runs + 1):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE, database_url],
+            cwd=root, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{run:>4} {result['import'] * 1000:>10.1f} {result['create_app'] * 1000:>14.1f} "
+              f"{result['first_request'] * 1000:>13.1f} {result['second_page'] * 1000:>12.1f} "
+              f"{str(result['openai_loaded']):>14}")
+
+if __name__ == '__main__':
+    main()
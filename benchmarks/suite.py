@@ -0,0 +1,157 @@
+"""End-to-end benchmark of the hot endpoints, compared against a stored baseline.
+
+Seeds a database with students, classes and years of weekly attendance,
+then drives the kiosk, search, check-in, scanned-code check-in, batch
+check-in and attendance report endpoints through the test client. For each endpoint it reports
+latency percentiles and SQL statements per request, and compares them
+with benchmarks/baseline.json. A regression (more queries, or p95 slower
+by more than --tolerance) makes the command exit non-zero.
+
+    python -m benchmarks.suite [--students 2000] [--years 2] [--iterations 200]
+    python -m benchmarks.suite --save-baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from datetime import date, timedelta
+from itertools import count
+
+from benchmarks.common import QueryCounter, make_app, seed_history, seed_roster, student_name, summarize, timed
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+WARMUP = 3
+BATCH_SIZE = 20
+
+def scenarios(student_ids, class_ids, codes):
+    """Return (name, request) pairs; each request takes the test client."""
+    kiosk_class, checkin_class, report_class, scan_class = (class_ids * 4)[:4]
+    names = [student_name(i) for i in range(0, len(student_ids), 7)]
+    searches = count()
+    checkins = count()
+    scans = count()
+    batches = count()
+    report_start = (date.today() - timedelta(days=90)).isoformat()
+
+    def search(client):
+        i = next(searches)
+        first, last = names[i % len(names)]
+        query = first[:3] if i % 2 else f'{first} {last[:2]}'
+        return client.get(f'/search_students?query={query}&class_id={kiosk_class}')
+
+    def checkin(client):
+        student_id = student_ids[next(checkins) % len(student_ids)]
+        return client.post('/mark_attendance', data={'student_id': student_id, 'class_id': checkin_class})
+
+    def scan(client):
+        code = codes[next(scans) % len(codes)]
+        return client.post('/checkin/scan', json={'code': code, 'class_id': scan_class})
+
+    def batch(client):
+        # Move to the next class once every student is checked in, so each
+        # batch is made of new check-ins
+        i = next(batches)
+        per_class = max(1, len(student_ids) // BATCH_SIZE)
+        start = i % per_class * BATCH_SIZE
+        return client.post('/mark_attendance_batch', json={
+            'student_ids': student_ids[start:start + BATCH_SIZE],
+            'class_id': class_ids[i // per_class % len(class_ids)]
+        })
+
+    return [
+        ('kiosk', lambda client: client.get(f'/kiosk/{kiosk_class}')),
+        ('search_students', search),
+        ('mark_attendance', checkin),
+        ('scan_checkin', scan),
+        ('mark_attendance_batch', batch),
+        ('attendance_report', lambda client: client.get(
+            f'/admin/attendance/report?class_id={report_class}&start_date={report_start}'
+        )),
+    ]
+
+def run(n_students, n_classes, years, iterations):
+    app = make_app()
+    client = app.test_client()
+
+    from app import db
+    from app.models import Student
+    with app.app_context():
+        student_ids, class_ids = seed_roster(n_students, n_classes=n_classes)
+        rows = seed_history(student_ids, class_ids, years=years)
+        codes = [row[0] for row in db.session.query(Student.checkin_code).order_by(Student.id)]
+        engine = db.engine
+    print(f"seeded {n_students} students, {n_classes} classes, {rows} attendance rows")
+
+    results = {}
+    for name, request in scenarios(student_ids, class_ids, codes):
+        for _ in range(WARMUP):
+            request(client)
+        samples = []
+        queries = []
+        for _ in range(iterations):
+            with QueryCounter(engine) as counter:
+                elapsed, response = timed(request, client)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{name} returned {response.status_code}')
+            samples.append(elapsed)
+            queries.append(counter.count)
+        results[name] = dict(summarize(samples), queries=statistics.median(queries))
+    return results
+
+def compare(results, baseline, tolerance):
+    """Print results next to the baseline; return the names that regressed."""
+    regressions = []
+    print(f"{'endpoint':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}  vs baseline")
+    for name, result in results.items():
+        line = (f"{name:<22} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+                f"{result['p99']:>8.2f} {result['queries']:>8g}")
+        base = baseline.get(name)
+        if base is None:
+            print(f"{line}  (no baseline)")
+            continue
+        notes = [f"p95 {(result['p95'] / base['p95'] - 1) * 100:+.0f}%"]
+        if result['queries'] > base['queries']:
+            notes.append(f"queries {base['queries']:g} -> {result['queries']:g}")
+        if result['queries'] > base['queries'] or result['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(name)
+            notes.append('REGRESSION')
+        print(f"{line}  {', '.join(notes)}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--classes', type=int, default=4)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 slowdown as a fraction of the baseline')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write these results as the new baseline')
+    args = parser.parse_args()
+
+    dataset = {'students': args.students, 'classes': args.classes, 'years': args.years}
+    results = run(args.students, args.classes, args.years, args.iterations)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'dataset': dataset, 'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        compare(results, {}, args.tolerance)
+        print(f"baseline written to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored['dataset'] != dataset:
+            print(f"note: baseline was recorded with {stored['dataset']}")
+        baseline = stored['results']
+    if compare(results, baseline, args.tolerance):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
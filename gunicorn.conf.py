@@ -0,0 +1,26 @@
+# Gunicorn settings for Easy CheckIn (gunicorn -c gunicorn.conf.py run:app)
+#
+# gevent workers serve each connection from a greenlet, so long-lived
+# connections (kiosk event streams, streaming exports, slow chat calls)
+# cost a little memory instead of a whole worker. Set
+# GUNICORN_WORKER_CLASS=sync for the classic one-request-per-worker mode.
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+# Concurrent connections per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Sync workers are killed after this many seconds on one request; kiosk
+# event streams end (and reconnect) well within it
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Each worker imports the app after gevent has patched the standard
+# library, so the app must not be preloaded in the master
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')